@@ -0,0 +1,92 @@
+"""
+Concurrent load test against a running API instance.
+
+Run it once against the sync baseline and once against the async build with
+the same arguments to compare throughput and latency under concurrency:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 \
+        --path "/api/v1/products/search?q=red+shoes" --concurrency 64 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Callable, List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def fixed_request(path: str, method: str = "GET", body=None, headers=None) -> Callable[[int], dict]:
+    return lambda i: {"method": method, "url": path, "json": body, "headers": headers}
+
+
+async def run_load(url: str, make_request: Callable[[int], dict], concurrency: int, total: int):
+    """Send `total` requests from `concurrency` workers; make_request(i) returns httpx.request kwargs."""
+    latencies = []
+    errors = 0
+    sent = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal sent, errors
+        while sent < total:
+            request = make_request(sent)
+            sent += 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the Saleano API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/v1/products/")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--json", dest="body", type=json.loads, default=None, help="JSON request body")
+    parser.add_argument("--token", default=None, help="Bearer token for authenticated routes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+    make_request = fixed_request(args.path, args.method, args.body, headers)
+    results = [
+        {"path": args.path, "method": args.method, **asyncio.run(run_load(args.url, make_request, concurrency, args.requests))}
+        for concurrency in args.concurrency
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Seed a synthetic catalog for benchmarks into the database at POSTGRES_URL.
+
+Creates shops, products with ready embeddings from the deterministic local
+embedder, and users with long chat histories. The same --seed always produces
+the same names, prices and histories, so runs at the same scale are comparable:
+
+    EMBEDDING_PROVIDER=local python -m benchmarks.seed --shops 50 --products 100000 --users 200 --messages 200
+
+Use a dedicated benchmark database: --reset deletes every row in it. A manifest
+with the scale and user credentials is written for benchmarks.suite.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+import src.main  # noqa: F401  (registers all models on the metadata)
+from src.db import engine
+from src.models.shop import Shop
+from src.models.product import Product
+from src.models.user import User
+from src.models.chat import ChatMessage
+from src.lib.migrations import run_migrations
+from src.lib.embedding_cache import normalize_text
+from src.lib.embedding_worker import embedding_text
+from src.lib.gemini import EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID, local_embeddings
+from src.lib.passwords import pwd_context
+from benchmarks.synthetic import BENCHMARK_PASSWORD, DEFAULT_MANIFEST, TAGS, NOUNS, product_name, product_description
+
+
+def insert_batches(connection, table, rows, batch_size: int):
+    for i in range(0, len(rows), batch_size):
+        connection.execute(insert(table), rows[i:i + batch_size])
+
+
+def seed_shops(connection, rng: random.Random, count: int):
+    rows = [
+        Shop(
+            name=f"Benchmark Shop {i}",
+            description=f"Synthetic shop {i} selling {rng.choice(NOUNS)}",
+            tags=json.dumps(rng.sample(TAGS, 2)),
+        ).model_dump()
+        for i in range(count)
+    ]
+    connection.execute(insert(Shop), rows)
+    return [row["id"] for row in rows]
+
+
+def seed_products(connection, rng: random.Random, shop_ids, count: int, batch_size: int):
+    start = datetime.utcnow() - timedelta(days=30)
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(count, offset + batch_size)):
+            name = product_name(rng)
+            rows.append(Product(
+                name=name,
+                description=product_description(rng, name),
+                price=round(rng.uniform(1, 500), 2),
+                shop_id=rng.choice(shop_ids),
+                created_at=start + timedelta(seconds=i),
+            ).model_dump())
+        embeddings = local_embeddings([normalize_text(embedding_text(Product(**row))) for row in rows])
+        for row, embedding in zip(rows, embeddings):
+            row.update(embedding=embedding, embedding_status="ready", embedding_model=EMBEDDING_MODEL_ID)
+        connection.execute(insert(Product), rows)
+        print(f"  products: {offset + len(rows)}/{count}")
+
+
+def seed_users(connection, rng: random.Random, count: int, messages: int, batch_size: int):
+    hashed = pwd_context.hash(BENCHMARK_PASSWORD)
+    users = [
+        User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password=hashed).model_dump()
+        for i in range(count)
+    ]
+    connection.execute(insert(User), users)
+
+    start = datetime.utcnow() - timedelta(days=7)
+    for user in users:
+        rows = []
+        for i in range(messages):
+            name = product_name(rng)
+            rows.append(ChatMessage(
+                user_id=user["id"],
+                message=f"Do you have a {name} under {rng.randint(20, 400)} dollars?",
+                response=f"Yes, we have a {name}. {product_description(rng, name)}",
+                timestamp=start + timedelta(minutes=i),
+            ).model_dump())
+        insert_batches(connection, ChatMessage, rows, batch_size)
+    return [user["email"] for user in users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shops", type=int, default=20)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=100, help="chat messages per user")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="delete all existing rows first")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+
+    if EMBEDDING_PROVIDER != "local":
+        raise SystemExit("Set EMBEDDING_PROVIDER=local so seeded and query embeddings share a vector space")
+
+    rng = random.Random(args.seed)
+    run_migrations(engine)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        if args.reset:
+            connection.execute(text(
+                "TRUNCATE chatsummary, chatmessage, product, shop, \"user\", embeddingcache CASCADE"
+            ))
+        shop_ids = seed_shops(connection, rng, args.shops)
+        seed_products(connection, rng, shop_ids, args.products, args.batch_size)
+        emails = seed_users(connection, rng, args.users, args.messages, args.batch_size)
+        connection.execute(text("ANALYZE"))
+
+    manifest = {
+        "seed": args.seed,
+        "shops": args.shops,
+        "products": args.products,
+        "users": args.users,
+        "messages_per_user": args.messages,
+        "embedding_model": EMBEDDING_MODEL_ID,
+        "password": BENCHMARK_PASSWORD,
+        "emails": emails,
+        "shop_ids": [str(shop_id) for shop_id in shop_ids],
+        "seeded_at": datetime.utcnow().isoformat(),
+        "seed_s": round(time.perf_counter() - started, 1),
+    }
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Seeded in {manifest['seed_s']}s; manifest written to {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compare response serialization paths for large responses; no database needed.
+
+For each response model, times building the JSON body three ways:
+
+- validated+json: validate into the response model (from hydrated ORM objects
+  where the endpoint used them) and encode with the standard library, FastAPI's
+  default path
+- validated+orjson: the same validation, rendered by the app-wide ORJSONResponse
+- rows+orjson: dicts built straight from row tuples, dumped with orjson, as the
+  list and shop detail endpoints now do
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5 --json serialization.json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+from uuid import uuid4
+
+import orjson
+from pydantic import TypeAdapter
+
+import src.main  # noqa: F401  (registers all models on the metadata)
+from src.models.product import Product
+from src.models.shop import Shop
+from src.routes.product import SHOP_FIELDS
+from src.routes.shop import SHOP_LIST_FIELDS, SHOP_PRODUCT_FIELDS
+from src.schemas.product import ProductListResponse, ProductSearchResponse
+from src.schemas.shop import ShopWithProductsResponse
+from benchmarks.synthetic import product_name, product_description
+
+
+def synthetic_rows(rows: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    shop = (uuid4(), "Benchmark Shop", "A synthetic shop", '["home", "gifts"]', now, now)
+    products = []
+    for i in range(rows):
+        name = product_name(rng)
+        products.append((
+            uuid4(), name, product_description(rng, name), round(rng.uniform(1, 500), 2), shop[0], "ready",
+            now - timedelta(seconds=i),
+        ))
+    return shop, products
+
+
+def time_path(fn: Callable[[], bytes], repeat: int) -> dict:
+    timings: List[float] = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(timings), 2), "min_ms": round(min(timings), 2), "bytes": size}
+
+
+def shop_with_products_paths(shop, products):
+    def validated():
+        shop_obj = Shop(**dict(zip(SHOP_LIST_FIELDS, shop)))
+        shop_obj.products = [Product(**dict(zip(SHOP_PRODUCT_FIELDS, row[:6]))) for row in products]
+        return ShopWithProductsResponse.model_validate(shop_obj).model_dump(mode="json")
+
+    def rows():
+        return {**dict(zip(SHOP_LIST_FIELDS, shop)), "products": [dict(zip(SHOP_PRODUCT_FIELDS, row[:6])) for row in products]}
+
+    return validated, rows
+
+
+def product_list_paths(shop, products):
+    adapter = TypeAdapter(List[ProductListResponse])
+    fields = ("id", "name", "description", "price")
+    shop_item = dict(zip(SHOP_FIELDS, shop))
+
+    def validated():
+        items = [{**dict(zip(fields, row[:4])), "shop": shop_item} for row in products]
+        return adapter.dump_python(adapter.validate_python(items), mode="json", exclude_unset=True)
+
+    def rows():
+        return [{**dict(zip(fields, row[:4])), "shop": shop_item} for row in products]
+
+    return validated, rows
+
+
+def product_search_paths(shop, products):
+    adapter = TypeAdapter(List[ProductSearchResponse])
+
+    def validated():
+        items = [{"name": row[1], "price": row[3], "description": row[2]} for row in products]
+        return adapter.dump_python(adapter.validate_python(items), mode="json")
+
+    def rows():
+        return [{"name": row[1], "price": row[3], "description": row[2]} for row in products]
+
+    return validated, rows
+
+
+MODELS = {
+    "ShopWithProductsResponse": shop_with_products_paths,
+    "ProductListResponse": product_list_paths,
+    "ProductSearchResponse": product_search_paths,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    shop, products = synthetic_rows(args.rows, args.seed)
+    report = {"rows": args.rows, "repeat": args.repeat, "models": {}}
+    for model, paths in MODELS.items():
+        validated, rows = paths(shop, products)
+        results = {
+            "validated+json": time_path(lambda: json.dumps(validated()).encode("utf-8"), args.repeat),
+            "validated+orjson": time_path(lambda: orjson.dumps(validated()), args.repeat),
+            "rows+orjson": time_path(lambda: orjson.dumps(rows()), args.repeat),
+        }
+        baseline = results["validated+json"]["median_ms"]
+        for result in results.values():
+            result["speedup"] = round(baseline / result["median_ms"], 2) if result["median_ms"] else None
+        report["models"][model] = results
+        print(model)
+        for path, result in results.items():
+            print(f"  {path:<16} {result['median_ms']:>9.2f} ms  x{result['speedup']}  ({result['bytes']} bytes)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
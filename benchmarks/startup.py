@@ -0,0 +1,127 @@
+"""
+Measure cold start of one API process, split into import and init cost.
+
+Every repetition runs in a fresh interpreter:
+
+- import: wall time of `import src.main`, plus self time per top-level
+  package from `python -X importtime`
+- init: the app lifespan until the process is ready (schema setup when
+  RUN_MIGRATIONS is on, worker start, warm-up) with the time of each phase;
+  needs the database from POSTGRES_URL
+
+    python -m benchmarks.startup --repeat 5 --json startup.json
+    RUN_MIGRATIONS=false python -m benchmarks.startup --repeat 5   # production profile
+    python -m benchmarks.startup --skip-init                        # no database needed
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import src.main
+print(json.dumps({"import_s": time.perf_counter() - start}))
+"""
+
+INIT_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+import src.main
+from src.lib.startup import startup
+import_s = time.perf_counter() - start
+
+async def main():
+    start = time.perf_counter()
+    async with src.main.app.router.lifespan_context(src.main.app):
+        # Warm-up runs inside the lifespan, so the process is ready here
+        lifespan_s = time.perf_counter() - start
+    print(json.dumps({
+        "import_s": import_s, "lifespan_s": lifespan_s,
+        "phases": startup.phases, "errors": startup.errors,
+    }))
+
+asyncio.run(main())
+"""
+
+# Background jobs would compete with the measurement, so the child processes run without them
+CHILD_ENV = {"EMBEDDING_WORKERS": "0", "NEIGHBORS_WORKERS": "0", "SHOP_DELETION_WORKERS": "0"}
+
+
+def run_child(script: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", script],
+        capture_output=True, text=True, check=True, env={**os.environ, **CHILD_ENV},
+    )
+
+
+def last_json_line(output: str) -> dict:
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_breakdown(stderr: str) -> Dict[str, float]:
+    """Self time in ms per top-level package from `-X importtime` output."""
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1000
+    return dict(totals)
+
+
+def median_ms(values: List[float]) -> float:
+    return round(statistics.median(values) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import breakdown")
+    parser.add_argument("--skip-init", action="store_true", help="only measure imports (no database needed)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    import_times = []
+    packages = defaultdict(list)
+    for _ in range(args.repeat):
+        import_times.append(last_json_line(run_child(IMPORT_SCRIPT).stdout)["import_s"])
+        for package, ms in import_breakdown(run_child("import src.main", "-X", "importtime").stderr).items():
+            packages[package].append(ms)
+    breakdown = sorted(((package, round(statistics.median(ms), 1)) for package, ms in packages.items()), key=lambda item: -item[1])
+    report = {
+        "repeat": args.repeat,
+        "import_ms": median_ms(import_times),
+        "import_packages_ms": dict(breakdown[:args.top]),
+    }
+    print(f"import src.main: {report['import_ms']} ms (median of {args.repeat})")
+    for package, ms in breakdown[:args.top]:
+        print(f"  {package:<24} {ms:>8.1f} ms")
+
+    if not args.skip_init:
+        runs = [last_json_line(run_child(INIT_SCRIPT).stdout) for _ in range(args.repeat)]
+        phases = sorted({name for run in runs for name in run["phases"]})
+        report["init"] = {
+            "lifespan_ms": median_ms([run["lifespan_s"] for run in runs]),
+            "phases_ms": {name: median_ms([run["phases"].get(name, 0.0) for run in runs]) for name in phases},
+            "errors": runs[-1]["errors"],
+        }
+        init = report["init"]
+        print(f"lifespan startup (until ready): {init['lifespan_ms']} ms")
+        for name, ms in init["phases_ms"].items():
+            print(f"  {name:<24} {ms:>8.1f} ms")
+        if init["errors"]:
+            print(f"  errors: {init['errors']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark suite for the API hot paths against a running instance.
+
+Seed the database with benchmarks.seed, start the API with the local
+embedder and the stub chat backend so no external calls are made:
+
+    EMBEDDING_PROVIDER=local LLM_BACKEND=stub uvicorn src.main:app
+
+then run every scenario at each concurrency level:
+
+    python -m benchmarks.suite --concurrency 1 16 64 --requests 500 --label baseline
+    python -m benchmarks.suite --label after-change --compare benchmarks/results/baseline.json
+
+Each run is written as JSON (p50/p95/p99 latency, throughput and error count
+per scenario and concurrency) so runs can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks.load_test import run_load
+from benchmarks.synthetic import DEFAULT_MANIFEST, product_name
+
+API = "/api/v1"
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+
+def search_queries(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [product_name(rng) for _ in range(count)]
+
+
+async def login_tokens(url: str, emails: List[str], password: str) -> List[str]:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        tokens = []
+        for email in emails:
+            response = await client.post(f"{API}/auth/login", json={"email": email, "password": password})
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+    return tokens
+
+
+def build_scenarios(manifest: dict, tokens: List[str], queries: List[str]) -> Dict[str, Callable[[int], dict]]:
+    shop_ids = manifest["shop_ids"]
+    emails = manifest["emails"]
+
+    def auth(i: int) -> dict:
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    scenarios = {
+        "products_list": lambda i: {"method": "GET", "url": f"{API}/products/?limit=50"},
+        "shops_list": lambda i: {"method": "GET", "url": f"{API}/shops/?limit=50"},
+        "shop_detail": lambda i: {"method": "GET", "url": f"{API}/shops/{shop_ids[i % len(shop_ids)]}?include_products=true"},
+        "login": lambda i: {
+            "method": "POST",
+            "url": f"{API}/auth/login",
+            "json": {"email": emails[i % len(emails)], "password": manifest["password"]},
+        },
+        "chat_history": lambda i: {"method": "GET", "url": f"{API}/chat/?limit=50", "headers": auth(i)},
+        "chat": lambda i: {
+            "method": "POST",
+            "url": f"{API}/chat/",
+            "json": {"message": f"Do you have a {queries[i % len(queries)]}?", "shop_id": shop_ids[i % len(shop_ids)]},
+            "headers": auth(i),
+        },
+    }
+    for mode in SEARCH_MODES:
+        scenarios[f"search_{mode}"] = (
+            lambda mode: lambda i: {
+                "method": "GET",
+                "url": f"{API}/products/search",
+                "params": {"q": queries[i % len(queries)], "mode": mode, "limit": 10},
+            }
+        )(mode)
+    return scenarios
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(baseline: dict, current: dict):
+    print(f"{'scenario':<16} {'conc':>5} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'rps before':>11} {'rps after':>10}")
+    for scenario, runs in current["results"].items():
+        before_runs = {run["concurrency"]: run for run in baseline.get("results", {}).get(scenario, [])}
+        for run in runs:
+            before = before_runs.get(run["concurrency"])
+            if before is None:
+                continue
+            change = (run["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            print(
+                f"{scenario:<16} {run['concurrency']:>5} {before['p95_ms']:>11.2f} {run['p95_ms']:>10.2f} "
+                f"{change:>+7.1f}% {before['throughput_rps']:>11.2f} {run['throughput_rps']:>10.2f}"
+            )
+
+
+async def run_suite(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    queries = search_queries(args.queries, manifest["seed"])
+    tokens = await login_tokens(args.url, manifest["emails"][:args.sessions], manifest["password"])
+    scenarios = build_scenarios(manifest, tokens, queries)
+    selected = args.scenarios or list(scenarios)
+
+    results = {}
+    for name in selected:
+        results[name] = []
+        for concurrency in args.concurrency:
+            report = await run_load(args.url, scenarios[name], concurrency, args.requests)
+            print(f"{name:<16} c={concurrency:<4} p50={report['p50_ms']}ms p95={report['p95_ms']}ms "
+                  f"p99={report['p99_ms']}ms rps={report['throughput_rps']} errors={report['errors']}")
+            results[name].append(report)
+
+    return {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "url": args.url,
+        "scale": {key: manifest[key] for key in ("seed", "shops", "products", "users", "messages_per_user", "embedding_model")},
+        "config": {"concurrency": args.concurrency, "requests": args.requests, "queries": args.queries},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--scenarios", nargs="*", help="subset of scenarios to run (default: all)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--queries", type=int, default=200, help="distinct search queries to cycle through")
+    parser.add_argument("--sessions", type=int, default=20, help="users to log in for authenticated scenarios")
+    parser.add_argument("--label", default=datetime.utcnow().strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<label>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare p95 latency and throughput against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_suite(args))
+    output = args.output or os.path.join("benchmarks", "results", f"{args.label}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
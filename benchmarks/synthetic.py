@@ -0,0 +1,24 @@
+"""Synthetic catalog vocabulary shared by the seeding script and the benchmark suite."""
+import random
+
+BENCHMARK_PASSWORD = "benchmark-password"
+DEFAULT_MANIFEST = "benchmarks/results/seed.json"
+
+ADJECTIVES = [
+    "red", "blue", "green", "black", "white", "leather", "wool", "cotton", "vintage", "modern",
+    "lightweight", "waterproof", "organic", "handmade", "classic", "compact", "wireless", "premium",
+]
+NOUNS = [
+    "shoes", "jacket", "hat", "backpack", "lamp", "mug", "chair", "watch", "headphones", "scarf",
+    "notebook", "bottle", "blanket", "sunglasses", "wallet", "kettle", "speaker", "gloves",
+]
+TAGS = ["fashion", "home", "outdoor", "electronics", "kitchen", "gifts", "sports", "office"]
+
+
+def product_name(rng: random.Random) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+
+def product_description(rng: random.Random, name: str) -> str:
+    extras = " ".join(rng.choice(ADJECTIVES) for _ in range(rng.randint(4, 12)))
+    return f"A {name} that is {extras}."
@@ -0,0 +1,123 @@
+"""
+Compare ANN index storage modes on the products already in the database.
+
+For each of halfvec, truncated and binary the script builds an index alongside
+the table, then reports its size, build time, query latency and recall@k
+against an exact full-precision scan. Query vectors are sampled from stored
+product embeddings, so no Gemini calls are made:
+
+    python -m benchmarks.vector_storage --queries 100 --limit 10 --json results.json
+
+Run it on a copy of production data; indexes are dropped again afterwards.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+import src.main  # noqa: F401  (registers all models on the metadata)
+from src.db import engine
+from src.models.product import Product
+from src.lib.search import vector_search_stmt
+from src.lib.vector_index import (
+    VECTOR_INDEX_STORAGES, HNSW_M, HNSW_EF_CONSTRUCTION, VECTOR_RERANK_FACTOR, index_expression,
+)
+from benchmarks.load_test import percentile
+
+
+def build_index(session: Session, storage: str) -> dict:
+    name = f"ix_bench_embedding_{storage}"
+    expression, opclass = index_expression(storage)
+    session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    start = time.perf_counter()
+    session.execute(text(
+        f"CREATE INDEX {name} ON product USING hnsw ({expression} {opclass}) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    ))
+    build_s = time.perf_counter() - start
+    size = session.execute(text("SELECT pg_relation_size(:name)"), {"name": name}).scalar()
+    return {"name": name, "build_s": round(build_s, 2), "index_bytes": size}
+
+
+def run_queries(session: Session, storage: str, queries, limit: int, ef_search: int, exact_ids=None):
+    latencies, recalls, results = [], [], []
+    for i, query in enumerate(queries):
+        stmt = vector_search_stmt([Product.id], query, limit, exact=exact_ids is None, storage=storage)
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+        start = time.perf_counter()
+        ids = [row.id for row in session.exec(stmt).all()]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids)
+        if exact_ids is not None:
+            expected = exact_ids[i]
+            recalls.append(len(set(ids) & set(expected)) / len(expected) if expected else 1.0)
+    report = {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+    }
+    if recalls:
+        report[f"recall@{limit}"] = round(statistics.fmean(recalls), 4)
+    return report, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--storage", nargs="*", default=list(VECTOR_INDEX_STORAGES))
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        table_bytes = session.execute(text("SELECT pg_table_size('product')")).scalar()
+        queries = [
+            list(embedding)
+            for embedding in session.exec(
+                select(Product.embedding)
+                .where(Product.embedding_status == "ready")
+                .order_by(func.random())
+                .limit(args.queries)
+            ).all()
+        ]
+        if not queries:
+            raise SystemExit("No embedded products to benchmark against")
+
+        # Ground truth from a sequential full-precision scan
+        session.execute(text("SET LOCAL enable_indexscan = off"))
+        exact_report, exact_ids = run_queries(session, "halfvec", queries, args.limit, args.ef_search)
+        session.rollback()
+
+        report = {
+            "queries": len(queries),
+            "limit": args.limit,
+            "ef_search": args.ef_search,
+            "rerank_factor": VECTOR_RERANK_FACTOR,
+            "table_bytes": table_bytes,
+            "exact": exact_report,
+            "storage": {},
+        }
+        for storage in args.storage:
+            index = build_index(session, storage)
+            session.commit()
+            try:
+                results, _ = run_queries(session, storage, queries, args.limit, args.ef_search, exact_ids)
+                report["storage"][storage] = {**index, **results}
+                session.rollback()
+            finally:
+                session.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+                session.commit()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Production server profile: gunicorn -c gunicorn.conf.py src.main:app
+import multiprocessing
+import os
+
+# Workers skip schema setup; it runs once in the master below
+os.environ.setdefault("RUN_MIGRATIONS", "false")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+# Import the app once in the master so workers fork with modules already loaded
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+
+def on_starting(server):
+    if os.getenv("MIGRATE_ON_START", "true").lower() != "true":
+        return
+    from src.db import engine
+    from src.lib.migrations import run_migrations
+
+    run_migrations(engine)
+    # Connections must not be shared with the forked workers
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    from src.db import engine
+
+    # Drop any pooled connection inherited from the master without closing it under the master
+    engine.dispose(close=False)
@@ -1 +1,7 @@
-API_VERSION = "v1"
\ No newline at end of file
+import os
+
+API_VERSION = "v1"
+
+# Stored embedding size. gemini-embedding-001 is Matryoshka-trained, so 768 or
+# 1536 keep most of the quality of the full 3072 at a fraction of the storage.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", 3072))
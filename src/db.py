@@ -1,14 +1,90 @@
 # Database connection and session management
-from sqlmodel import create_engine, Session
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
+from src.lib.metrics import instrument_engine
+import asyncio
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("POSTGRES_URL")
+# The request path uses asyncpg; the sync engine is kept for migrations and scripts
+ASYNC_DATABASE_URL = os.getenv("POSTGRES_ASYNC_URL") or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+# Optional read replica for list and search endpoints
+REPLICA_URL = os.getenv("POSTGRES_REPLICA_URL")
+ASYNC_REPLICA_URL = os.getenv("POSTGRES_REPLICA_ASYNC_URL") or (
+    make_url(REPLICA_URL).set(drivername="postgresql+asyncpg") if REPLICA_URL else None
+)
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
 
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+engine = create_engine(DATABASE_URL, pool_pre_ping=POOL_OPTIONS["pool_pre_ping"])
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+read_async_engine = create_async_engine(ASYNC_REPLICA_URL, **POOL_OPTIONS) if ASYNC_REPLICA_URL else async_engine
+for db_engine in (engine, async_engine, read_async_engine):
+    instrument_engine(db_engine)
+
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+read_session_maker = async_sessionmaker(read_async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_session():
+    async with async_session_maker() as session:
+        yield session
+
+async def get_read_session():
+    """Session for read-only endpoints; uses the replica when one is configured."""
+    async with read_session_maker() as session:
+        yield session
+
+def _engines():
+    engines = {"primary": async_engine}
+    if read_async_engine is not async_engine:
+        engines["replica"] = read_async_engine
+    return engines
+
+def pool_stats():
+    stats = {}
+    for name, db_engine in _engines().items():
+        pool = db_engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": POOL_OPTIONS["max_overflow"],
+        }
+    return stats
+
+async def check_database_health():
+    health = {}
+    for name, db_engine in _engines().items():
+        try:
+            async with db_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            health[name] = "ok"
+        except Exception as e:
+            health[name] = f"error: {e.__class__.__name__}"
+    return health
+
+async def prime_pools():
+    """Open pool_size connections per engine so the first requests skip connection setup."""
+    async def touch(db_engine):
+        async with db_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    for db_engine in _engines().values():
+        await asyncio.gather(*(touch(db_engine) for _ in range(POOL_OPTIONS["pool_size"])))
+
+async def dispose_engines():
+    for db_engine in _engines().values():
+        await db_engine.dispose()
@@ -1,26 +1,42 @@
 from datetime import datetime, timedelta
 from typing import Optional
 import os
+import threading
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.db import get_session
 from src.models.user import User
+from src.schemas.user import TokenUser
+from src.lib.passwords import verify_and_update_password
 
 SECRET_KEY = os.getenv("SECRET_KEY") 
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified token -> user record, so authenticated requests skip the user lookup
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))
+# Let hot endpoints trust the user id / is_active claims signed into the token
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_user_cache_lock = threading.Lock()
+
 oauth2_scheme = HTTPBearer()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def user_token_claims(user: User) -> dict:
+    return {"sub": user.email, "uid": str(user.id), "username": user.username, "active": user.is_active}
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def invalidate_user(email: Optional[str] = None, user_id=None):
+    """Drop cached tokens for a user; call whenever the user row is written."""
+    with _user_cache_lock:
+        for token, user in list(_user_cache.items()):
+            if (email is not None and user.email == email) or (user_id is not None and user.id == user_id):
+                _user_cache.pop(token, None)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -32,28 +48,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(session: Session, email: str, password: str):
-    user = session.exec(select(User).where(User.email == email)).first()
+async def authenticate_user(session: AsyncSession, email: str, password: str):
+    user = (await session.exec(select(User).where(User.email == email))).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is CPU bound, keep it off the event loop
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        # Stored hash uses outdated cost settings
+        user.hashed_password = new_hash
+        await session.commit()
+        invalidate_user(user_id=user.id)
     return user
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme), session: Session = Depends(get_session)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=401,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise credentials_exception
-    user = session.exec(select(User).where(User.email == email)).first()
-    if user is None:
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
+    token = credentials.credentials
+    with _user_cache_lock:
+        user = _user_cache.get(token)
+    if user is not None:
+        # The cache TTL can outlive the token, so expiry is still checked
+        decode_token(token)
+        return user
+
+    payload = decode_token(token)
+    user = (await session.exec(select(User).where(User.email == payload["sub"]))).first()
+    if user is None or not user.is_active:
         raise credentials_exception
-    return user
\ No newline at end of file
+
+    session.expunge(user)
+    with _user_cache_lock:
+        _user_cache[token] = user
+    return user
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)) -> TokenUser:
+    """
+    Lightweight current user for hot endpoints.
+
+    With AUTH_TRUST_TOKEN_CLAIMS enabled the signed claims are used as-is and no
+    database or cache lookup happens; tokens issued before the claims existed
+    fall back to get_current_user.
+    """
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        payload = decode_token(credentials.credentials)
+        if "uid" in payload:
+            if not payload.get("active", False):
+                raise credentials_exception
+            return TokenUser(id=payload["uid"], email=payload["sub"], username=payload.get("username"), is_active=True)
+
+    user = await get_current_user(credentials, session)
+    return TokenUser(id=user.id, email=user.email, username=user.username, is_active=user.is_active)
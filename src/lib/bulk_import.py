@@ -0,0 +1,187 @@
+import codecs
+import csv
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, List, Tuple
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.product import Product
+from src.schemas.product import BulkProductRow
+from src.lib.catalog import bump_catalog_version
+from src.lib.dedup import apply_dedup, reuse_embeddings, DEDUP_MODE
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", 500))
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def _iter_json_array(request: Request) -> AsyncIterator[object]:
+    """Decode the elements of a top-level JSON array as the body streams in.
+
+    Only the undecoded tail of the body is held in memory, so the cost is one
+    record rather than the whole upload.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = request.stream()
+    buffer = ""
+    pos = 0
+    done = False
+
+    async def fill() -> bool:
+        nonlocal buffer, pos, done
+        if done:
+            return False
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            done = True
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    async def next_char() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\n\r":
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not await fill():
+                return ""
+
+    if await next_char() != "[":
+        raise ValueError("Expected a JSON array of products")
+    pos += 1
+    if await next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            # An element cut off at a chunk boundary fails to decode (or, for a
+            # number, decodes short), so read on until input follows it
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if not await fill():
+                        raise ValueError(f"Invalid JSON: {e}")
+                    continue
+                if end == len(buffer) and await fill():
+                    continue
+                break
+            pos = end
+            yield record
+            char = await next_char()
+            pos += 1
+            if char == "]":
+                break
+            if char != ",":
+                raise ValueError(f"Invalid JSON: expected ',' or ']' but got {char!r}" if char else "Invalid JSON: unterminated array")
+            await next_char()
+
+    if await next_char():
+        raise ValueError("Invalid JSON: extra data after the array")
+
+
+async def iter_records(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row_number, raw_record) from a JSON array, NDJSON or CSV request body."""
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        row = 0
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row, ValueError(f"Invalid JSON: {e}")
+
+    elif content_type in CSV_TYPES:
+        header = None
+        pending = ""
+        row = 0
+        async for line in _iter_lines(request):
+            pending = f"{pending}\n{line}" if pending else line
+            # A record is complete once its quotes are balanced (RFC 4180 doubles escaped quotes)
+            if pending.count('"') % 2:
+                continue
+            record, pending = pending, ""
+            if not record.strip():
+                continue
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row += 1
+            yield row, dict(zip(header, values))
+
+    else:
+        row = 0
+        async for record in _iter_json_array(request):
+            row += 1
+            yield row, record
+
+
+def validate_record(record) -> BulkProductRow:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Expected an object")
+    return BulkProductRow.model_validate(record)
+
+
+async def import_chunk(session: AsyncSession, shop_id, chunk: List[Tuple[int, BulkProductRow]]) -> List[Dict]:
+    """Insert one chunk in a single transaction; returns per-row errors.
+
+    Rows are stored with embedding_status pending and embedded by the background queue,
+    except duplicates of already embedded products, which reuse their embedding.
+    """
+    try:
+        rows = [Product(**item.model_dump(), shop_id=shop_id).model_dump() for _, item in chunk]
+        matches = await apply_dedup(session, shop_id, rows)
+        errors = []
+        if DEDUP_MODE == "reject" and matches:
+            errors = [
+                {"row": chunk[position][0], "error": f"Duplicate of product {match.canonical_id}"}
+                for position, match in sorted(matches.items())
+            ]
+            rows = [row for position, row in enumerate(rows) if position not in matches]
+            matches = {}
+        if rows:
+            await session.execute(insert(Product), rows)
+            await reuse_embeddings(session, [rows[position]["id"] for position in matches])
+            await bump_catalog_version(session, shop_id)
+        await session.commit()
+        return errors
+    except Exception as e:
+        await session.rollback()
+        logger.exception("Bulk import chunk failed")
+        return [{"row": row, "error": str(e)} for row, _ in chunk]
+
+
+def format_validation_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+    return str(error)
@@ -0,0 +1,33 @@
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.shop import Shop
+from src.lib.chatbot import invalidate_shop_prompt
+
+
+async def bump_catalog_version(session: AsyncSession, shop_id: UUID):
+    """Mark a shop's catalog as changed; call in the same transaction as the product write."""
+    await session.execute(
+        update(Shop).where(Shop.id == shop_id).values(catalog_version=Shop.catalog_version + 1)
+    )
+    invalidate_shop_prompt(shop_id)
+
+
+async def catalog_versions(session: AsyncSession, shop_id: Optional[UUID] = None) -> Optional[Dict[str, int]]:
+    """Versions that cached search results over the shop (or the whole catalog) are stamped with.
+
+    Read in the same session as the search itself, so results are never older
+    than the versions they are stored under. A shop query reads that shop's
+    catalog_version; a catalog-wide query uses the sum and count over all shops,
+    which changes with every bump, shop creation and purge. None when the shop
+    does not exist, so nothing is cached for it.
+    """
+    if shop_id is not None:
+        version = (await session.exec(select(Shop.catalog_version).where(Shop.id == shop_id))).first()
+        return None if version is None else {str(shop_id): version}
+    shops, total = (await session.exec(
+        select(func.count(Shop.id), func.coalesce(func.sum(Shop.catalog_version), 0))
+    )).one()
+    return {"shops": shops, "catalog": int(total)}
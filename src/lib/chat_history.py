@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.chat import ChatMessage, ChatSummary
+
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", 5))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", 2000))
+CHAT_SUMMARY_BATCH_SIZE = int(os.getenv("CHAT_SUMMARY_BATCH_SIZE", 100))
+SUMMARY_LINE_CHARS = 200
+
+
+async def recent_messages(session: AsyncSession, user_id: UUID, limit: int = CHAT_HISTORY_WINDOW) -> List[ChatMessage]:
+    """Last `limit` messages in chronological order, using the (user_id, timestamp) index."""
+    messages = (await session.exec(
+        select(ChatMessage)
+        .where(ChatMessage.user_id == user_id)
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        .limit(limit)
+    )).all()
+    return list(reversed(messages))
+
+
+def _truncate(text: str, limit: int = SUMMARY_LINE_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def summarize_turns(previous_summary: str, messages: List[ChatMessage], max_chars: int = CHAT_SUMMARY_MAX_CHARS) -> str:
+    """Append one line per turn and drop the oldest lines to stay within max_chars."""
+    lines = [line for line in previous_summary.split("\n") if line]
+    for msg in messages:
+        line = f"- User asked: {_truncate(msg.message)}"
+        if msg.response:
+            line += f" / Assistant replied: {_truncate(msg.response)}"
+        lines.append(line)
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+async def refresh_summary(session: AsyncSession, user_id: UUID, window: int = CHAT_HISTORY_WINDOW) -> Optional[ChatSummary]:
+    """
+    Roll turns that have left the recent window into the user's stored summary.
+
+    Only turns newer than the last roll-up are read, at most CHAT_SUMMARY_BATCH_SIZE
+    per call, so the cost does not grow with the length of the history.
+    """
+    # Oldest message still inside the window; everything before it belongs in the summary
+    boundary = (await session.exec(
+        select(ChatMessage.timestamp, ChatMessage.id)
+        .where(ChatMessage.user_id == user_id)
+        .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        .offset(window - 1)
+        .limit(1)
+    )).first()
+    if boundary is None:
+        return await session.get(ChatSummary, user_id)
+
+    # Create the row if needed, then lock it: concurrent refreshes for the same user
+    # neither fail on the insert nor roll the same turns in twice
+    await session.execute(
+        insert(ChatSummary)
+        .values(user_id=user_id, summary="", summarized_count=0, updated_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    summary = (await session.exec(
+        select(ChatSummary)
+        .where(ChatSummary.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )).one()
+
+    # Compare (timestamp, id) so messages sharing a timestamp are neither skipped nor summarized twice
+    position = tuple_(ChatMessage.timestamp, ChatMessage.id)
+    stmt = select(ChatMessage).where(ChatMessage.user_id == user_id, position < tuple_(*boundary))
+    if summary.summarized_until_id:
+        stmt = stmt.where(position > tuple_(summary.summarized_until, summary.summarized_until_id))
+    pending = (await session.exec(
+        stmt.order_by(ChatMessage.timestamp, ChatMessage.id).limit(CHAT_SUMMARY_BATCH_SIZE)
+    )).all()
+    if not pending:
+        await session.commit()
+        return summary
+
+    summary.summary = summarize_turns(summary.summary, pending)
+    summary.summarized_until = pending[-1].timestamp
+    summary.summarized_until_id = pending[-1].id
+    summary.summarized_count += len(pending)
+    summary.updated_at = datetime.utcnow()
+    await session.commit()
+    return summary
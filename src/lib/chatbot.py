@@ -1,8 +1,132 @@
 from typing import List, Optional
-from src.models.shop import Shop
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from cachetools import LRUCache
+from src.models.shop import Shop, ShopStats
 from src.models.product import Product
 from src.models.chat import ChatMessage
+from src.schemas.product import SearchFilters
+from src.lib.gemini import get_embedding
+from src.lib.search import vector_search_stmt, sort_by_distance
+from src.lib.vector_index import apply_search_params
 import json
+import os
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 4000))
+PROMPT_TOP_K = int(os.getenv("PROMPT_TOP_K", 20))
+
+# shop_id -> [(updated_at, catalog_version), shop section, (top_k, default product rows) or None]
+_shop_prompt_cache = LRUCache(maxsize=int(os.getenv("SHOP_PROMPT_CACHE_SIZE", 256)))
+
+SHOP_INSTRUCTIONS = """
+    INSTRUCTIONS:
+    - Be friendly and helpful when answering customer questions
+    - Provide accurate information about products, prices, and availability
+    - If asked about products not in the catalog, politely inform the customer
+    - Help customers compare products and make informed decisions
+    - Answer questions about pricing, product features, and shop policies
+    - If you don't have information about something, be honest about it
+    - Encourage customers to ask questions about specific products or categories
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def _format_tags(shop: Shop) -> str:
+    if not shop.tags:
+        return ""
+    try:
+        tags_data = json.loads(shop.tags)
+        if isinstance(tags_data, list):
+            return f"Tags: {', '.join(tags_data)}"
+        elif isinstance(tags_data, dict):
+            return f"Tags: {', '.join([f'{k}: {v}' for k, v in tags_data.items()])}"
+        else:
+            return f"Tags: {shop.tags}"
+    except json.JSONDecodeError:
+        return f"Tags: {shop.tags}"
+
+
+def _format_shop_info(shop: Shop, product_count: int) -> str:
+    return f"""
+            Shop Name: {shop.name}
+            Description: {shop.description or 'No description available'}
+            {_format_tags(shop)}
+            Created: {shop.created_at.strftime('%Y-%m-%d')}
+            Total Products: {product_count}
+            """
+
+
+def _format_price_info(min_price: float, max_price: float, avg_price: float) -> str:
+    return f"""
+            PRICE RANGE:
+            - Lowest Price: ${min_price:.2f}
+            - Highest Price: ${max_price:.2f}
+            - Average Price: ${avg_price:.2f}
+            """
+
+
+def _format_shop_section(shop: Shop, stats: Optional[ShopStats]) -> str:
+    count = stats.product_count if stats else 0
+    section = _format_shop_info(shop, count)
+    if count:
+        section += _format_price_info(stats.price_min, stats.price_max, stats.price_sum / count)
+    return section
+
+
+def _format_product(i: int, product) -> str:
+    return f"""
+                {i}. {product.name}
+                - Description: {product.description}
+                - Price: ${product.price:.2f}
+                - Product ID: {product.id}
+                """
+
+
+def _format_history(chat_history: Optional[List[ChatMessage]], limit: int, assistant_label: str, closing: str, indent: str = "    ") -> str:
+    if not chat_history:
+        return ""
+    parts = [f"\n\n{indent}RECENT CONVERSATION HISTORY:\n{indent}"]
+    for msg in chat_history[-limit:]:
+        parts.append(f"User: {msg.message}\n")
+        if msg.response:
+            parts.append(f"{assistant_label}: {msg.response}\n")
+        parts.append("\n")
+    parts.append(closing)
+    return "".join(parts)
+
+
+def _format_summary(conversation_summary: Optional[str]) -> str:
+    if not conversation_summary:
+        return ""
+    return f"""
+
+    EARLIER CONVERSATION SUMMARY:
+    {conversation_summary}"""
+
+
+def _format_shop_prompt(shop: Shop, shop_section: str, products_section: str, history_section: str, current_message: Optional[str], conversation_summary: Optional[str] = None) -> str:
+    parts = [
+        f"You are a helpful shopping assistant for {shop.name}.\n\n",
+        f"    SHOP INFORMATION:{shop_section}{products_section}\n",
+        SHOP_INSTRUCTIONS,
+        f"\n    Remember: You only have information about {shop.name} and its products listed above.",
+        _format_summary(conversation_summary),
+        history_section,
+    ]
+    if current_message:
+        parts.append(f"""
+
+    CURRENT USER MESSAGE: "{current_message}"
+
+    Please provide a helpful, contextual response based on the shop information, product catalog, and conversation history above.""")
+    return "".join(parts).strip()
+
+
+SHOP_HISTORY_CLOSING = "Use this conversation history to provide consistent and contextual responses.\n"
 
 
 def generate_shop_system_prompt(
@@ -10,6 +134,8 @@ def generate_shop_system_prompt(
     products: List[Product],
     chat_history: Optional[List[ChatMessage]] = None,
     current_message: Optional[str] = None,
+    conversation_summary: Optional[str] = None,
+    stats: Optional[ShopStats] = None,
 ) -> str:
     """
     Generate a system prompt for a chatbot based on shop, product information, and chat context.
@@ -19,107 +145,119 @@ def generate_shop_system_prompt(
         products: List of Product objects belonging to the shop
         chat_history: Optional list of previous ChatMessage objects for context
         current_message: Optional current user message being processed
+        conversation_summary: Optional rolling summary of turns older than chat_history
+        stats: Optional ShopStats row; when given, the count and price range come from it
+            instead of iterating products
 
     Returns:
         str: Formatted system prompt for the chatbot
     """
 
-    # Parse tags if they exist
-    tags_info = ""
-    if shop.tags:
-        try:
-            tags_data = json.loads(shop.tags)
-            if isinstance(tags_data, list):
-                tags_info = f"Tags: {', '.join(tags_data)}"
-            elif isinstance(tags_data, dict):
-                tags_info = (
-                    f"Tags: {', '.join([f'{k}: {v}' for k, v in tags_data.items()])}"
-                )
-            else:
-                tags_info = f"Tags: {shop.tags}"
-        except json.JSONDecodeError:
-            tags_info = f"Tags: {shop.tags}"
-
-    # Build shop information section
-    shop_info = f"""
-            Shop Name: {shop.name}
-            Description: {shop.description or 'No description available'}
-            {tags_info}
-            Created: {shop.created_at.strftime('%Y-%m-%d')}
-            Total Products: {len(products)}
-            """
+    shop_section = _format_shop_section(shop, stats) if stats is not None else _format_shop_info(shop, len(products))
+    if stats is None and products:
+        prices = [p.price for p in products]
+        shop_section += _format_price_info(min(prices), max(prices), sum(prices) / len(prices))
 
-    # Build products information section
-    products_info = "\nPRODUCTS:\n"
-    if products:
-        for i, product in enumerate(products, 1):
-            products_info += f"""
-                {i}. {product.name}
-                - Description: {product.description}
-                - Price: ${product.price:.2f}
-                - Product ID: {product.id}
-                """
-    else:
-        products_info += "No products available.\n"
+    products_section = "\nPRODUCTS:\n" + (
+        "".join(_format_product(i, product) for i, product in enumerate(products, 1))
+        if products else "No products available.\n"
+    )
 
-    # Build price range information
-    if products:
-        prices = [p.price for p in products]
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
+    # Show last 5 messages for context (to avoid token limits)
+    history_section = _format_history(chat_history, 5, "Assistant", SHOP_HISTORY_CLOSING)
 
-        price_info = f"""
-            PRICE RANGE:
-            - Lowest Price: ${min_price:.2f}
-            - Highest Price: ${max_price:.2f}
-            - Average Price: ${avg_price:.2f}
-            """
-    else:
-        price_info = ""
+    return _format_shop_prompt(shop, shop_section, products_section, history_section, current_message, conversation_summary)
 
-    # Combine all sections into the system prompt
-    system_prompt = f"""You are a helpful shopping assistant for {shop.name}.
 
-    SHOP INFORMATION:{shop_info}{price_info}{products_info}
+def invalidate_shop_prompt(shop_id):
+    _shop_prompt_cache.pop(shop_id, None)
 
-    INSTRUCTIONS:
-    - Be friendly and helpful when answering customer questions
-    - Provide accurate information about products, prices, and availability
-    - If asked about products not in the catalog, politely inform the customer
-    - Help customers compare products and make informed decisions
-    - Answer questions about pricing, product features, and shop policies
-    - If you don't have information about something, be honest about it
-    - Encourage customers to ask questions about specific products or categories
 
-    Remember: You only have information about {shop.name} and its products listed above."""
+async def _cached_shop_entry(session: AsyncSession, shop: Shop) -> list:
+    """Cache entry for the shop, rebuilt with a fresh summary when the shop or its catalog changes."""
+    version = (shop.updated_at, shop.catalog_version)
+    cached = _shop_prompt_cache.get(shop.id)
+    if cached and cached[0] == version:
+        return cached
 
-    # Add chat history context if provided
-    if chat_history:
-        system_prompt += f"""
+    # Aggregates are maintained by triggers, so this is a primary key lookup
+    entry = [version, _format_shop_section(shop, await session.get(ShopStats, shop.id)), None]
+    _shop_prompt_cache[shop.id] = entry
+    return entry
 
-    RECENT CONVERSATION HISTORY:
+
+async def _cached_default_products(session: AsyncSession, shop: Shop, entry: list, top_k: int):
+    """Default product listing for prompts without a message to rank by; loaded on first use."""
+    if entry[2] is not None and entry[2][0] == top_k:
+        return entry[2][1]
+    default_products = (await session.exec(
+        select(Product.id, Product.name, Product.description, Product.price)
+        .where(Product.shop_id == shop.id)
+        .order_by(Product.created_at, Product.id)
+        .limit(top_k)
+    )).all()
+    entry[2] = (top_k, default_products)
+    return default_products
+
+
+async def build_shop_system_prompt(
+    session: AsyncSession,
+    shop: Shop,
+    chat_history: Optional[List[ChatMessage]] = None,
+    current_message: Optional[str] = None,
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    top_k: int = PROMPT_TOP_K,
+    conversation_summary: Optional[str] = None,
+) -> str:
     """
-        # Show last 5 messages for context (to avoid token limits)
-        recent_messages = chat_history[-5:] if len(chat_history) > 5 else chat_history
+    Generate a shop system prompt that fits a token budget.
 
-        for msg in recent_messages:
-            system_prompt += f"User: {msg.message}\n"
-            if msg.response:
-                system_prompt += f"Assistant: {msg.response}\n"
-            system_prompt += "\n"
+    Instead of listing the whole catalog, only the top_k products most similar to
+    current_message are included, and only as many as fit in the budget.
 
-        system_prompt += "Use this conversation history to provide consistent and contextual responses.\n"
+    Args:
+        session: Database session
+        shop: Shop object containing shop details
+        chat_history: Optional list of previous ChatMessage objects for context
+        current_message: Optional current user message being processed
+        token_budget: Approximate token budget for the whole prompt
+        top_k: Maximum number of products to include
+        conversation_summary: Optional rolling summary of turns older than chat_history
+
+    Returns:
+        str: Formatted system prompt for the chatbot
+    """
+
+    entry = await _cached_shop_entry(session, shop)
+    shop_section = entry[1]
 
-    # Add current message context if provided
     if current_message:
-        system_prompt += f"""
+        filters = SearchFilters(shop_id=shop.id)
+        query_embedding = await get_embedding(current_message)
+        await apply_search_params(session, filtered=True)
+        products = sort_by_distance((await session.exec(
+            vector_search_stmt([Product.id, Product.name, Product.description, Product.price], query_embedding, top_k, filters)
+        )).all())
+    else:
+        products = await _cached_default_products(session, shop, entry, top_k)
 
-    CURRENT USER MESSAGE: "{current_message}"
+    history_section = _format_history(chat_history, 5, "Assistant", SHOP_HISTORY_CLOSING)
 
-    Please provide a helpful, contextual response based on the shop information, product catalog, and conversation history above."""
+    # Add products in relevance order until the budget is used up
+    remaining = token_budget - estimate_tokens(
+        _format_shop_prompt(shop, shop_section, "\nPRODUCTS:\n", history_section, current_message, conversation_summary)
+    )
+    product_parts = []
+    for i, product in enumerate(products, 1):
+        formatted = _format_product(i, product)
+        cost = estimate_tokens(formatted)
+        if cost > remaining:
+            break
+        product_parts.append(formatted)
+        remaining -= cost
 
-    return system_prompt.strip()
+    products_section = "\nPRODUCTS:\n" + ("".join(product_parts) if product_parts else "No products available.\n")
+    return _format_shop_prompt(shop, shop_section, products_section, history_section, current_message, conversation_summary)
 
 
 def generate_product_comparison_prompt(
@@ -174,6 +312,7 @@ def generate_generic_system_prompt(
     chat_history: Optional[List[ChatMessage]] = None,
     current_message: Optional[str] = None,
     context: Optional[str] = None,
+    conversation_summary: Optional[str] = None,
 ) -> str:
     """
     Generate a generic system prompt for a chatbot without shop-specific information.
@@ -182,6 +321,7 @@ def generate_generic_system_prompt(
         chat_history: Optional list of previous ChatMessage objects for context
         current_message: Optional current user message being processed
         context: Optional additional context information to include
+        conversation_summary: Optional rolling summary of turns older than chat_history
 
     Returns:
         str: Formatted generic system prompt for the chatbot
@@ -204,6 +344,9 @@ def generate_generic_system_prompt(
     ADDITIONAL CONTEXT:
     {context}"""
 
+    # Add the summary of older turns if provided
+    system_prompt += _format_summary(conversation_summary)
+
     # Add chat history context if provided
     if chat_history:
         system_prompt += f"""
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Dict, List, NamedTuple
+from uuid import UUID
+from sqlalchemy import text, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.product import Product
+from src.lib.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEDUP_MODE = os.getenv("DEDUP_MODE", "flag").lower()  # flag | reject | off
+# Maximum Hamming distance between 64-bit SimHashes for a near duplicate. Candidates share
+# at least one of eight 8-bit bands, which guarantees every match up to 7 bits is found.
+DEDUP_SIMHASH_THRESHOLD = int(os.getenv("DEDUP_SIMHASH_THRESHOLD", 6))
+DEDUP_REUSE_EMBEDDINGS = os.getenv("DEDUP_REUSE_EMBEDDINGS", "near").lower()  # near | exact | none
+DEDUP_BACKFILL_BATCH_SIZE = int(os.getenv("DEDUP_BACKFILL_BATCH_SIZE", 1000))
+
+SIMHASH_BANDS = 8
+SIMHASH_BAND_BITS = 8
+SHINGLE_SIZE = 4
+
+
+class DuplicateMatch(NamedTuple):
+    canonical_id: UUID
+    exact: bool
+
+
+def product_text(name: str, description: str) -> str:
+    return normalize_text(f"{name} {description}")
+
+
+def content_hash(name: str, description: str) -> str:
+    return hashlib.sha256(product_text(name, description).encode("utf-8")).hexdigest()
+
+
+def simhash(name: str, description: str) -> int:
+    """64-bit SimHash over character shingles, as a signed value for a BIGINT column.
+
+    Character shingles rather than words keep a one-word edit to a few bits on short texts.
+    """
+    normalized = product_text(name, description)
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    result = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return result - (1 << 64) if result >= 1 << 63 else result
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & ((1 << 64) - 1)).bit_count()
+
+
+def simhash_bands(shop_id: UUID, value: int) -> List[int]:
+    """Band keys for the GIN index: each 8-bit band hashed together with its position and the shop.
+
+    Keying on the shop keeps lookups shop-selective with a single index; rare collisions are
+    harmless because matches are confirmed by shop and Hamming distance.
+    """
+    keys = []
+    for band in range(SIMHASH_BANDS):
+        bits = (value >> (band * SIMHASH_BAND_BITS)) & ((1 << SIMHASH_BAND_BITS) - 1)
+        digest = hashlib.blake2b(f"{shop_id}:{band}:{bits}".encode("utf-8"), digest_size=4).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def fingerprint(row: Dict, shop_id: UUID):
+    """Fill content_hash, simhash and simhash_bands on a product row dict."""
+    row["content_hash"] = content_hash(row["name"], row["description"])
+    row["simhash"] = simhash(row["name"], row["description"])
+    row["simhash_bands"] = simhash_bands(shop_id, row["simhash"])
+
+
+# The content hash and band conditions each have an index, so candidates come from a BitmapOr
+FIND_DUPLICATES_SQL = f"""
+SELECT c.position, coalesce(p.duplicate_of, p.id) AS canonical_id, p.content_hash = c.content_hash AS exact
+FROM unnest(CAST(:positions AS integer[]), CAST(:simhashes AS bigint[]), CAST(:content_hashes AS varchar[]))
+    AS c(position, simhash, content_hash)
+JOIN LATERAL (
+    SELECT p.id, p.duplicate_of, p.content_hash
+    FROM product p
+    WHERE p.shop_id = :shop_id
+      AND (p.content_hash = c.content_hash
+           OR p.simhash_bands && (CAST(:bands AS integer[]))[c.position * {SIMHASH_BANDS} + 1:(c.position + 1) * {SIMHASH_BANDS}])
+      AND (p.content_hash = c.content_hash
+           OR length(replace(CAST(CAST(p.simhash # c.simhash AS bit(64)) AS text), '0', '')) <= :threshold)
+    ORDER BY p.content_hash = c.content_hash DESC, p.created_at
+    LIMIT 1
+) p ON true
+"""
+
+
+def _match_within(rows: List[Dict], matches: Dict[int, DuplicateMatch]):
+    """Add duplicates among the rows themselves, pointing at the first copy's canonical product."""
+    def canonical(position: int) -> UUID:
+        return matches[position].canonical_id if position in matches else rows[position]["id"]
+
+    by_hash: Dict[str, int] = {}
+    by_band: Dict[int, List[int]] = {}
+    for position, row in enumerate(rows):
+        bands = row["simhash_bands"]
+        first = by_hash.setdefault(row["content_hash"], position)
+        if first != position:
+            if position not in matches or not matches[position].exact:
+                matches[position] = DuplicateMatch(canonical(first), True)
+        elif position not in matches:
+            # Existing products win over copies within the same upload
+            near = sorted(
+                other for key in bands for other in by_band.get(key, [])
+                if hamming(rows[other]["simhash"], row["simhash"]) <= DEDUP_SIMHASH_THRESHOLD
+            )
+            if near:
+                matches[position] = DuplicateMatch(canonical(near[0]), False)
+        for key in bands:
+            by_band.setdefault(key, []).append(position)
+
+
+async def find_duplicates(session: AsyncSession, shop_id: UUID, rows: List[Dict]) -> Dict[int, DuplicateMatch]:
+    """Map row positions to the existing product (or earlier row) each one duplicates within the shop."""
+    if not rows:
+        return {}
+    result = await session.execute(text(FIND_DUPLICATES_SQL), {
+        "positions": list(range(len(rows))),
+        "simhashes": [row["simhash"] for row in rows],
+        "content_hashes": [row["content_hash"] for row in rows],
+        "bands": [key for row in rows for key in row["simhash_bands"]],
+        "shop_id": shop_id,
+        "threshold": DEDUP_SIMHASH_THRESHOLD,
+    })
+    matches = {row.position: DuplicateMatch(row.canonical_id, row.exact) for row in result}
+    _match_within(rows, matches)
+    return matches
+
+
+async def apply_dedup(session: AsyncSession, shop_id: UUID, rows: List[Dict]) -> Dict[int, DuplicateMatch]:
+    """Fingerprint product rows and flag duplicates in place; returns every match found.
+
+    With DEDUP_MODE=reject the caller should drop the returned rows instead of inserting them.
+    """
+    for row in rows:
+        fingerprint(row, shop_id)
+    if DEDUP_MODE == "off":
+        return {}
+    matches = await find_duplicates(session, shop_id, rows)
+    for position, match in matches.items():
+        rows[position]["duplicate_of"] = match.canonical_id
+    return matches
+
+
+async def reuse_embeddings(session: AsyncSession, product_ids: List[UUID]):
+    """Copy ready embeddings from canonical products so duplicates skip the embedding queue."""
+    if DEDUP_REUSE_EMBEDDINGS == "none" or not product_ids:
+        return
+    exact_only = "AND p.content_hash = c.content_hash" if DEDUP_REUSE_EMBEDDINGS == "exact" else ""
+    await session.execute(text(f"""
+        UPDATE product p
+        SET embedding = c.embedding, embedding_status = 'ready', embedding_model = c.embedding_model,
+            reembed_requested = c.reembed_requested
+        FROM product c
+        WHERE p.id = ANY(:ids) AND c.id = p.duplicate_of AND c.embedding_status = 'ready' {exact_only}
+    """), {"ids": list(product_ids)})
+
+
+async def backfill(session: AsyncSession, batch_size: int = DEDUP_BACKFILL_BATCH_SIZE) -> int:
+    """Fingerprint one batch of products created before dedup existed; returns the rows updated."""
+    rows = (await session.exec(
+        select(Product.id, Product.shop_id, Product.name, Product.description)
+        .where(Product.content_hash.is_(None))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if rows:
+        updates = []
+        for row in rows:
+            values = {"id": row.id, "name": row.name, "description": row.description}
+            fingerprint(values, row.shop_id)
+            del values["name"], values["description"]
+            updates.append(values)
+        await session.execute(update(Product), updates)
+    await session.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # Fingerprint existing products so new uploads are compared against them
+    from src.db import async_session_maker
+
+    async def main():
+        total = 0
+        while True:
+            async with async_session_maker() as session:
+                updated = await backfill(session)
+            if not updated:
+                break
+            total += updated
+            logger.info("Fingerprinted %d products", total)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import threading
+from cachetools import TTLCache
+from sqlmodel import select
+from sqlalchemy.dialects.postgresql import insert
+from src.db import async_session_maker
+from src.models.embedding_cache import EmbeddingCache
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 3600))
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class _CountingTTLCache(TTLCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+
+    def popitem(self):
+        # Only called when the cache is full and has to make room
+        self.evictions += 1
+        return super().popitem()
+
+
+class EmbeddingCacheStore:
+    """Two-tier embedding cache: in-process LRU with TTL in front of a Postgres table."""
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE, ttl: int = EMBEDDING_CACHE_TTL, persist: bool = EMBEDDING_CACHE_PERSIST):
+        self._memory = _CountingTTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.persist = persist
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    async def get_many(self, model: str, texts):
+        """Return {key: embedding} for every text that is cached in either tier."""
+        keys = {cache_key(model, text) for text in texts}
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._memory.get(key)
+                if value is not None:
+                    found[key] = value
+            self.memory_hits += len(found)
+
+        remaining = keys - found.keys()
+        if remaining and self.persist:
+            async with async_session_maker() as session:
+                rows = (await session.exec(
+                    select(EmbeddingCache.key, EmbeddingCache.embedding).where(EmbeddingCache.key.in_(remaining))
+                )).all()
+            with self._lock:
+                for key, embedding in rows:
+                    embedding = list(embedding)
+                    self._memory[key] = embedding
+                    found[key] = embedding
+                self.store_hits += len(rows)
+
+        with self._lock:
+            self.misses += len(keys - found.keys())
+        return found
+
+    async def set_many(self, model: str, items):
+        """Store (text, embedding) pairs in both tiers."""
+        rows = {}
+        with self._lock:
+            for text, embedding in items:
+                key = cache_key(model, text)
+                self._memory[key] = list(embedding)
+                rows[key] = {"key": key, "model": model, "embedding": list(embedding)}
+
+        if rows and self.persist:
+            stmt = insert(EmbeddingCache).values(list(rows.values())).on_conflict_do_nothing(index_elements=["key"])
+            async with async_session_maker() as session:
+                await session.execute(stmt)
+                await session.commit()
+
+    async def preload(self, model: str, limit: int) -> int:
+        """Load the most recently stored embeddings into memory, e.g. before a worker takes traffic."""
+        if not self.persist or limit <= 0:
+            return 0
+        async with async_session_maker() as session:
+            rows = (await session.exec(
+                select(EmbeddingCache.key, EmbeddingCache.embedding)
+                .where(EmbeddingCache.model == model)
+                .order_by(EmbeddingCache.created_at.desc())
+                .limit(limit)
+            )).all()
+        with self._lock:
+            for key, embedding in rows:
+                self._memory[key] = list(embedding)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "evictions": self._memory.evictions,
+                "size": len(self._memory),
+                "maxsize": self._memory.maxsize,
+            }
+
+
+embedding_cache = EmbeddingCacheStore()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.product import Product
+from src.lib.gemini import get_embeddings, EMBEDDING_MODEL_ID
+from src.lib.catalog import bump_catalog_version
+from src.lib.neighbors import invalidate_neighbors
+from src.lib.search import live_products_clause
+from src.lib.workers import WorkerPool, run_standalone
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
+EMBEDDING_QUEUE_BATCH_SIZE = int(os.getenv("EMBEDDING_QUEUE_BATCH_SIZE", 100))
+EMBEDDING_QUEUE_POLL_INTERVAL = float(os.getenv("EMBEDDING_QUEUE_POLL_INTERVAL", 2.0))
+EMBEDDING_MAX_ATTEMPTS = int(os.getenv("EMBEDDING_MAX_ATTEMPTS", 5))
+EMBEDDING_RETRY_BASE_DELAY = float(os.getenv("EMBEDDING_RETRY_BASE_DELAY", 5.0))
+EMBEDDING_RATE_LIMIT = float(os.getenv("EMBEDDING_RATE_LIMIT", 5.0))  # batches per second, shared by the workers
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / rate seconds apart across all tasks in the process."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def embedding_text(product) -> str:
+    return product.name + " " + product.description
+
+
+async def process_batch(session: AsyncSession, rate_limiter: Optional[RateLimiter] = None, batch_size: int = EMBEDDING_QUEUE_BATCH_SIZE) -> int:
+    """Claim pending and re-embed products with SKIP LOCKED, embed them in one batch and store the results."""
+    now = datetime.utcnow()
+    batch = (await session.exec(
+        select(
+            Product.id, Product.shop_id, Product.name, Product.description,
+            Product.embedding_status, Product.embedding_attempts,
+        )
+        .where(
+            or_(Product.embedding_status == "pending", Product.reembed_requested),
+            # Products of shops awaiting purge are not worth a paid embedding call
+            live_products_clause(),
+            or_(Product.embedding_next_attempt_at.is_(None), Product.embedding_next_attempt_at <= now),
+        )
+        # Products without any vector are invisible to vector search, so they go before re-embeds
+        .order_by(Product.embedding_status != "pending", Product.embedding_next_attempt_at.nulls_first(), Product.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not batch:
+        await session.rollback()
+        return 0
+
+    if rate_limiter:
+        await rate_limiter.wait()
+
+    try:
+        embeddings = await get_embeddings([embedding_text(row) for row in batch])
+    except Exception as e:
+        logger.warning("Embedding batch of %d products failed: %r", len(batch), e)
+        updates = []
+        for row in batch:
+            exhausted = row.embedding_attempts + 1 >= EMBEDDING_MAX_ATTEMPTS
+            values = {
+                "id": row.id,
+                "embedding_attempts": row.embedding_attempts + 1,
+                "embedding_next_attempt_at": now + timedelta(seconds=EMBEDDING_RETRY_BASE_DELAY * 2 ** row.embedding_attempts),
+                "embedding_error": str(e)[:1000],
+            }
+            if row.embedding_status == "ready":
+                # A failed re-embed keeps the old vector; giving up only drops the request
+                values["reembed_requested"] = not exhausted
+            else:
+                values["embedding_status"] = "failed" if exhausted else "pending"
+            updates.append(values)
+        await session.execute(update(Product), updates)
+        await session.commit()
+        return len(batch)
+
+    await session.execute(update(Product), [
+        {
+            "id": row.id,
+            "embedding": embedding,
+            "embedding_status": "ready",
+            "embedding_model": EMBEDDING_MODEL_ID,
+            "reembed_requested": False,
+            "embedding_attempts": 0,
+            "embedding_next_attempt_at": None,
+            "embedding_error": None,
+        }
+        for row, embedding in zip(batch, embeddings)
+    ])
+    # New embeddings invalidate the precomputed similar-product lists they appear in
+    await invalidate_neighbors(session, [row.id for row in batch])
+    # Newly embedded products change search results
+    for shop_id in {row.shop_id for row in batch}:
+        await bump_catalog_version(session, shop_id)
+    await session.commit()
+    return len(batch)
+
+
+async def queue_reembed(session: AsyncSession, model: str = EMBEDDING_MODEL_ID) -> int:
+    """Queue products embedded with a different model for re-embedding, and retry failed ones.
+
+    Ready products keep their current vector, so they stay in vector, hybrid and
+    similar-product results until the worker replaces it.
+    """
+    retry = dict(embedding_attempts=0, embedding_next_attempt_at=None, embedding_error=None)
+    reembed = await session.execute(
+        update(Product)
+        .where(Product.embedding_status == "ready", or_(Product.embedding_model.is_(None), Product.embedding_model != model))
+        .values(reembed_requested=True, **retry)
+    )
+    failed = await session.execute(
+        update(Product).where(Product.embedding_status == "failed").values(embedding_status="pending", **retry)
+    )
+    await session.commit()
+    return reembed.rowcount + failed.rowcount
+
+
+async def queue_stats(session: AsyncSession):
+    rows = (await session.exec(
+        select(Product.embedding_status, func.count(Product.id)).group_by(Product.embedding_status)
+    )).all()
+    stats = {status: count for status, count in rows}
+    stats["reembed"] = (await session.exec(select(func.count(Product.id)).where(Product.reembed_requested))).one()
+    return stats
+
+
+rate_limiter = RateLimiter(EMBEDDING_RATE_LIMIT)
+
+
+async def run_once(session: AsyncSession) -> int:
+    return await process_batch(session, rate_limiter)
+
+
+def worker_pool(workers: int = EMBEDDING_WORKERS) -> WorkerPool:
+    return WorkerPool("Embedding", run_once, workers, EMBEDDING_QUEUE_POLL_INTERVAL)
+
+
+embedding_workers = worker_pool()
+
+
+if __name__ == "__main__":
+    # Standalone worker process, for deployments that run the API with EMBEDDING_WORKERS=0
+    run_standalone(worker_pool(max(EMBEDDING_WORKERS, 1)))
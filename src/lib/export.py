@@ -0,0 +1,60 @@
+import json
+import os
+import zlib
+from typing import AsyncIterator
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from src.db import read_session_maker
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+
+async def _ndjson_rows(stmt) -> AsyncIterator[bytes]:
+    # Own session: the request-scoped one may be closed before the stream finishes
+    async with read_session_maker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.mappings().partitions():
+            yield "".join(json.dumps(dict(row), default=str) + "\n" for row in partition).encode("utf-8")
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (gzip;q=0 refuses it)."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def ndjson_export(request: Request, stmt, filename: str) -> StreamingResponse:
+    """Stream the rows of `stmt` as NDJSON from a server-side cursor, gzipped if the client accepts it."""
+    # The body depends on Accept-Encoding, so shared caches must key on it
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    body = _ndjson_rows(stmt)
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        body = _gzip(body)
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
@@ -1,11 +1,83 @@
+import hashlib
 import os
-from google import genai
+from typing import List
+import numpy as np
+from src.constants import EMBEDDING_DIMENSIONS
+from src.lib.embedding_cache import embedding_cache, normalize_text, cache_key
+from src.lib.metrics import span
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini").lower()  # gemini | local
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
 
-def get_embedding(text: str):
-    result = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=[text]
-    )
-    return result.embeddings[0].values
\ No newline at end of file
+
+def embedding_model_id(dimensions: int) -> str:
+    """Identifies the vector space: model plus output size when it is truncated."""
+    if EMBEDDING_PROVIDER == "local":
+        return f"local-hash:{dimensions}"
+    if dimensions == 3072:
+        return EMBEDDING_MODEL
+    return f"{EMBEDDING_MODEL}:{dimensions}"
+
+
+EMBEDDING_MODEL_ID = embedding_model_id(EMBEDDING_DIMENSIONS)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+
+_client = None
+
+def get_client():
+    """Create the Gemini client on first use; importing google.genai is a large share of app import time."""
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
+
+def _token_vector(token: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSIONS)
+
+def local_embeddings(texts: List[str]) -> List[List[float]]:
+    """Deterministic offline embeddings for tests and benchmarks; no network calls.
+
+    Each text is the normalized sum of per-word random vectors, so texts that
+    share words are close to each other and search results stay meaningful.
+    """
+    embeddings = []
+    for text in texts:
+        vector = np.zeros(EMBEDDING_DIMENSIONS)
+        for token in text.split() or [""]:
+            vector += _token_vector(token)
+        embeddings.append((vector / np.linalg.norm(vector)).tolist())
+    return embeddings
+
+async def _embed_batch(batch: List[str]) -> List[List[float]]:
+    with span("embedding_api"):
+        if EMBEDDING_PROVIDER == "local":
+            return local_embeddings(batch)
+        from google.genai import types
+        result = await get_client().aio.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=batch,
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIMENSIONS),
+        )
+        return [embedding.values for embedding in result.embeddings]
+
+async def get_embedding(text: str):
+    return (await get_embeddings([text]))[0]
+
+async def get_embeddings(texts: List[str]):
+    """Embed many texts, sending only cache misses to the provider in batches."""
+    key_texts = [normalize_text(text) for text in texts]
+    cached = await embedding_cache.get_many(EMBEDDING_MODEL_ID, key_texts)
+
+    missing = list(dict.fromkeys(
+        text for text in key_texts if cache_key(EMBEDDING_MODEL_ID, text) not in cached
+    ))
+    for i in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[i:i + EMBEDDING_BATCH_SIZE]
+        embeddings = await _embed_batch(batch)
+        await embedding_cache.set_many(EMBEDDING_MODEL_ID, zip(batch, embeddings))
+        for text, embedding in zip(batch, embeddings):
+            cached[cache_key(EMBEDDING_MODEL_ID, text)] = embedding
+
+    return [cached[cache_key(EMBEDDING_MODEL_ID, text)] for text in key_texts]
@@ -0,0 +1,74 @@
+import asyncio
+from abc import ABC, abstractmethod
+import hashlib
+import os
+from typing import AsyncIterator, Optional
+from src.lib.gemini import get_client
+from src.lib.metrics import span
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()  # gemini | stub
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+
+
+class LLMBackend(ABC):
+    """Chat completion backend that streams the reply as text deltas."""
+
+    @abstractmethod
+    def stream(self, system_prompt: str, message: str) -> AsyncIterator[str]:
+        ...
+
+    async def complete(self, system_prompt: str, message: str) -> str:
+        with span("llm_completion"):
+            return "".join([delta async for delta in self.stream(system_prompt, message)])
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model: str = LLM_MODEL):
+        self.model = model
+
+    async def stream(self, system_prompt: str, message: str) -> AsyncIterator[str]:
+        from google.genai import types
+        response = await get_client().aio.models.generate_content_stream(
+            model=self.model,
+            contents=message,
+            config=types.GenerateContentConfig(system_instruction=system_prompt),
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend(LLMBackend):
+    """Deterministic local backend for tests and benchmarks; no network calls."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def stream(self, system_prompt: str, message: str) -> AsyncIterator[str]:
+        digest = hashlib.sha256(f"{system_prompt}\0{message}".encode("utf-8")).hexdigest()[:8]
+        reply = f"[stub {digest}] You said: {message}"
+        for i, word in enumerate(reply.split(" ")):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word if i == 0 else " " + word
+
+
+_backend: Optional[LLMBackend] = None
+
+
+def get_llm_backend() -> LLMBackend:
+    global _backend
+    if _backend is None:
+        if LLM_BACKEND == "stub":
+            _backend = StubBackend(delay=float(os.getenv("LLM_STUB_DELAY", 0)))
+        elif LLM_BACKEND == "gemini":
+            _backend = GeminiBackend()
+        else:
+            raise ValueError(f"Unsupported LLM_BACKEND: {LLM_BACKEND}")
+    return _backend
+
+
+def set_llm_backend(backend: LLMBackend):
+    """Swap the backend, e.g. for a StubBackend in tests."""
+    global _backend
+    _backend = backend
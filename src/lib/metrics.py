@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Log a per-request breakdown for requests slower than this many milliseconds; 0 disables it
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 0))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", 20))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items(), key=lambda item: item[0]):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def _render_value(self, key: Tuple, state) -> List[str]:
+        lines = []
+        for bound, count in zip(self.buckets, state["buckets"]):
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {state['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+REQUEST_QUERIES = Histogram(
+    "http_request_db_statements", "SQL statements executed per request", ("route",), buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL per request", ("route",))
+DB_STATEMENT_SECONDS = Histogram("db_statement_duration_seconds", "Latency of individual SQL statements")
+SPAN_SECONDS = Histogram("span_duration_seconds", "Latency of instrumented operations", ("span",))
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Database pool connections by state", ("pool", "state"))
+PASSWORD_POOL_TASKS = Gauge("password_pool_tasks", "Password hashing tasks: in_flight now, completed and rejected so far", ("state",))
+PASSWORD_POOL_SECONDS = Gauge("password_pool_task_seconds", "Password hashing queue wait and run time", ("stat",))
+
+
+@dataclass
+class RequestProfile:
+    route: str = "unmatched"
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    spans: Dict[str, float] = field(default_factory=dict)
+    statements: List[Tuple[float, str]] = field(default_factory=list)
+
+
+# Mutated in place, so statements run in SQLAlchemy's greenlets still reach the request's profile
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block, both into the span histogram and the current request's breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        profile = _profile.get()
+        if profile is not None:
+            profile.spans[name] = profile.spans.get(name, 0.0) + elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_STATEMENT_SECONDS.observe(elapsed)
+    profile = _profile.get()
+    if profile is not None:
+        profile.sql_count += 1
+        profile.sql_seconds += elapsed
+        if SLOW_REQUEST_MS and len(profile.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+            profile.statements.append((elapsed, " ".join(statement.split())[:300]))
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every statement run through the engine (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware so streaming
+    responses are timed to their last byte and context variables set here
+    are visible to the endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _profile.reset(token)
+            # Label by route template so path parameters do not explode the label set
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=profile.route, status=status)
+            REQUEST_QUERIES.observe(profile.sql_count, route=profile.route)
+            REQUEST_DB_SECONDS.observe(profile.sql_seconds, route=profile.route)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                log_slow_request(scope, status, elapsed, profile)
+
+
+def log_slow_request(scope, status: int, elapsed: float, profile: RequestProfile):
+    accounted = profile.sql_seconds + sum(profile.spans.values())
+    breakdown = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": profile.route,
+        "status": status,
+        "total_ms": round(elapsed * 1000, 2),
+        "sql_statements": profile.sql_count,
+        "sql_ms": round(profile.sql_seconds * 1000, 2),
+        "spans_ms": {name: round(seconds * 1000, 2) for name, seconds in profile.spans.items()},
+        # Python time outside SQL and spans: ORM hydration, validation and serialization
+        "other_ms": round(max(0.0, elapsed - accounted) * 1000, 2),
+        "statements": [
+            {"ms": round(seconds * 1000, 2), "sql": statement}
+            for seconds, statement in sorted(profile.statements, reverse=True)
+        ],
+    }
+    logger.warning("Slow request: %s", json.dumps(breakdown))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,100 @@
+# Idempotent schema migrations applied around SQLModel.metadata.create_all
+from sqlmodel import SQLModel
+from sqlalchemy import text
+from src.lib.vector_index import create_vector_index, resize_embedding_columns
+from src.lib.search import SEARCH_VECTOR_DDL
+from src.lib.shop_stats import SHOP_STATS_DDL
+
+# Statements that must run before the tables are created
+PRE_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS vector",
+]
+
+# Statements that upgrade tables created by older versions of the app
+MIGRATIONS = [
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_product_created_at_id ON product (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_shop_created_at_id ON shop (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_chatmessage_user_id_timestamp ON chatmessage (user_id, timestamp, id)",
+    SEARCH_VECTOR_DDL,
+    "CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_product_shop_id ON product (shop_id)",
+    "CREATE INDEX IF NOT EXISTS ix_product_price ON product (price)",
+    "ALTER TABLE shop ADD COLUMN IF NOT EXISTS catalog_version INTEGER NOT NULL DEFAULT 0",
+    # Rows embedded before the queue existed are marked ready once, when the column is added
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'product' AND column_name = 'embedding_status'
+        ) THEN
+            ALTER TABLE product ADD COLUMN embedding_status VARCHAR NOT NULL DEFAULT 'pending';
+            UPDATE product SET embedding_status = 'ready' WHERE embedding IS NOT NULL;
+        END IF;
+    END $$
+    """,
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS embedding_model VARCHAR",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS embedding_attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS embedding_next_attempt_at TIMESTAMP",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS embedding_error VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_product_embedding_pending ON product (embedding_next_attempt_at) WHERE embedding_status = 'pending'",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS reembed_requested BOOLEAN NOT NULL DEFAULT FALSE",
+    "CREATE INDEX IF NOT EXISTS ix_product_reembed_pending ON product (embedding_next_attempt_at) WHERE reembed_requested",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS neighbors_updated_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS ix_product_neighbors_pending ON product (created_at) WHERE neighbors_updated_at IS NULL AND embedding_status = 'ready'",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS simhash BIGINT",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS simhash_bands INTEGER[]",
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES product (id) ON DELETE SET NULL",
+    "CREATE INDEX IF NOT EXISTS ix_product_shop_content_hash ON product (shop_id, content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_product_simhash_bands ON product USING gin (simhash_bands)",
+    "CREATE INDEX IF NOT EXISTS ix_product_duplicate_of ON product (duplicate_of) WHERE duplicate_of IS NOT NULL",
+    *SHOP_STATS_DDL,
+    "ALTER TABLE shop ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS ix_shop_deleted_at ON shop (deleted_at) WHERE deleted_at IS NOT NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_shop_name_live ON shop (name) WHERE deleted_at IS NULL",
+    "DROP INDEX IF EXISTS ix_shop_name",
+    # Shop purges rely on the database cascading to products
+    """
+    DO $$ BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_constraint WHERE conname = 'product_shop_id_fkey' AND confdeltype <> 'c'
+        ) THEN
+            ALTER TABLE product DROP CONSTRAINT product_shop_id_fkey;
+            ALTER TABLE product ADD CONSTRAINT product_shop_id_fkey
+                FOREIGN KEY (shop_id) REFERENCES shop (id) ON DELETE CASCADE NOT VALID;
+            ALTER TABLE product VALIDATE CONSTRAINT product_shop_id_fkey;
+        END IF;
+    END $$
+    """,
+]
+
+
+# Session-level advisory lock key, so concurrent runs (several processes or replicas) take turns
+MIGRATION_LOCK_ID = 0x5C4E3A
+
+
+def run_migrations(engine):
+    # Autocommit, so the lock connection does not sit idle in a transaction while migrations run
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_connection:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            with engine.begin() as connection:
+                for statement in PRE_CREATE:
+                    connection.execute(text(statement))
+            SQLModel.metadata.create_all(engine)
+            with engine.begin() as connection:
+                for statement in MIGRATIONS:
+                    connection.execute(text(statement))
+                resize_embedding_columns(connection)
+                create_vector_index(connection)
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+if __name__ == "__main__":
+    import src.main  # noqa: F401  (registers all models on the metadata)
+    from src.db import engine
+
+    run_migrations(engine)
+    print("Migrations applied")
@@ -0,0 +1,151 @@
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import delete, func, or_, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.product import Product, ProductNeighbor
+from src.schemas.product import SearchFilters
+from src.lib.search import vector_search_stmt, sort_by_distance, live_products_clause
+from src.lib.vector_index import apply_search_params
+from src.lib.workers import WorkerPool, run_standalone
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_K = int(os.getenv("NEIGHBORS_K", 20))  # stored per product and scope; the endpoint limit is capped by it
+NEIGHBORS_WORKERS = int(os.getenv("NEIGHBORS_WORKERS", 1))
+NEIGHBORS_BATCH_SIZE = int(os.getenv("NEIGHBORS_BATCH_SIZE", 50))
+NEIGHBORS_POLL_INTERVAL = float(os.getenv("NEIGHBORS_POLL_INTERVAL", 5.0))
+NEIGHBOR_SCOPES = ("all", "shop")
+
+
+async def nearest(session: AsyncSession, product_id: UUID, embedding, shop_id: Optional[UUID] = None) -> List:
+    filters = SearchFilters(shop_id=shop_id) if shop_id is not None else None
+    await apply_search_params(session, filtered=filters is not None)
+    rows = (await session.exec(
+        vector_search_stmt([Product.id], embedding, NEIGHBORS_K + 1, filters)
+    )).all()
+    return [(row.id, float(row.distance)) for row in sort_by_distance(rows) if row.id != product_id][:NEIGHBORS_K]
+
+
+async def trim_neighbors(session: AsyncSession, product_ids: List[UUID]):
+    """Keep only the NEIGHBORS_K closest neighbors per product and scope."""
+    await session.execute(text(
+        "DELETE FROM productneighbor n USING ("
+        "  SELECT product_id, scope, neighbor_id,"
+        "         row_number() OVER (PARTITION BY product_id, scope ORDER BY distance) AS position"
+        "  FROM productneighbor WHERE product_id = ANY(:ids)"
+        ") ranked "
+        "WHERE n.product_id = ranked.product_id AND n.scope = ranked.scope "
+        "AND n.neighbor_id = ranked.neighbor_id AND ranked.position > :k"
+    ), {"ids": list(product_ids), "k": NEIGHBORS_K})
+
+
+async def process_batch(session: AsyncSession, batch_size: int = NEIGHBORS_BATCH_SIZE) -> int:
+    """Rebuild neighbor lists for queued products and insert them into their neighbors' lists.
+
+    A new product only needs its own ANN query: it is then offered to each of
+    its neighbors' lists, which are trimmed back to NEIGHBORS_K.
+    """
+    batch = (await session.exec(
+        select(Product.id, Product.shop_id, Product.embedding)
+        .where(Product.neighbors_updated_at.is_(None), Product.embedding_status == "ready", live_products_clause())
+        .order_by(Product.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not batch:
+        await session.rollback()
+        return 0
+
+    rows = []
+    for product in batch:
+        for scope in NEIGHBOR_SCOPES:
+            shop_id = product.shop_id if scope == "shop" else None
+            for neighbor_id, distance in await nearest(session, product.id, product.embedding, shop_id):
+                rows.append({"product_id": product.id, "scope": scope, "neighbor_id": neighbor_id, "distance": distance})
+                rows.append({"product_id": neighbor_id, "scope": scope, "neighbor_id": product.id, "distance": distance})
+
+    ids = [product.id for product in batch]
+    await session.execute(delete(ProductNeighbor).where(ProductNeighbor.product_id.in_(ids)))
+    if rows:
+        # Deduplicate and sort so concurrent batches lock rows in the same order
+        unique = {(row["product_id"], row["scope"], row["neighbor_id"]): row for row in rows}
+        stmt = insert(ProductNeighbor).values([unique[key] for key in sorted(unique, key=str)])
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["product_id", "scope", "neighbor_id"],
+            set_={"distance": stmt.excluded.distance},
+        ))
+        await trim_neighbors(session, list({row["product_id"] for row in unique.values()}))
+    await session.execute(
+        update(Product).where(Product.id.in_(ids)).values(neighbors_updated_at=datetime.utcnow())
+    )
+    await session.commit()
+    return len(batch)
+
+
+async def invalidate_neighbors(session: AsyncSession, product_ids: List[UUID]):
+    """Call when embeddings change: drops the products from other lists and queues every affected list."""
+    referencing = select(ProductNeighbor.product_id).where(ProductNeighbor.neighbor_id.in_(product_ids))
+    await session.execute(
+        update(Product)
+        .where(or_(Product.id.in_(product_ids), Product.id.in_(referencing)))
+        .values(neighbors_updated_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(delete(ProductNeighbor).where(ProductNeighbor.neighbor_id.in_(product_ids)))
+
+
+async def requeue_referencing(session: AsyncSession, neighbor_ids: List[UUID], exclude_shop_id: Optional[UUID] = None):
+    """Call before deleting products: their ON DELETE CASCADE shortens other lists, so queue those lists."""
+    referencing = select(ProductNeighbor.product_id).where(ProductNeighbor.neighbor_id.in_(neighbor_ids))
+    stmt = update(Product).where(Product.id.in_(referencing))
+    if exclude_shop_id is not None:
+        stmt = stmt.where(Product.shop_id != exclude_shop_id)
+    await session.execute(stmt.values(neighbors_updated_at=None).execution_options(synchronize_session=False))
+
+
+async def similar_products(
+    session: AsyncSession,
+    product_id: UUID,
+    limit: int,
+    scope: str = "all",
+    price_band: Optional[float] = None,
+):
+    """Read a precomputed neighbor list: one index range scan plus primary key joins."""
+    stmt = (
+        select(Product.id, Product.name, Product.description, Product.price, Product.shop_id, ProductNeighbor.distance)
+        .select_from(ProductNeighbor)
+        .join(Product, Product.id == ProductNeighbor.neighbor_id)
+        .where(ProductNeighbor.product_id == product_id, ProductNeighbor.scope == scope, live_products_clause())
+        .order_by(ProductNeighbor.distance)
+        .limit(limit)
+    )
+    if price_band is not None:
+        source = aliased(Product)
+        price = select(source.price).where(source.id == product_id).scalar_subquery()
+        stmt = stmt.where(Product.price.between(price * (1 - price_band), price * (1 + price_band)))
+    return (await session.exec(stmt)).all()
+
+
+async def neighbors_stats(session: AsyncSession):
+    pending = (await session.exec(
+        select(func.count(Product.id)).where(Product.neighbors_updated_at.is_(None), Product.embedding_status == "ready")
+    )).one()
+    return {"pending": pending, "k": NEIGHBORS_K}
+
+
+def worker_pool(workers: int = NEIGHBORS_WORKERS) -> WorkerPool:
+    return WorkerPool("Neighbor", process_batch, workers, NEIGHBORS_POLL_INTERVAL)
+
+
+neighbor_workers = worker_pool()
+
+
+if __name__ == "__main__":
+    # Standalone job, for deployments that run the API with NEIGHBORS_WORKERS=0
+    run_standalone(worker_pool(max(NEIGHBORS_WORKERS, 1)))
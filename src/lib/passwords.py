@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread").lower()  # thread | process
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", 32))
+
+# Hashes outside the configured cost are flagged by needs_update and rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordPool:
+    """Bounded executor for bcrypt work that sheds load with 429 once its queue is full."""
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE, kind: str = PASSWORD_POOL_KIND):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_s = 0.0
+        self.total_run_s = 0.0
+        self.max_run_s = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=429, detail="Too many authentication requests, retry shortly", headers={"Retry-After": "1"})
+            self.in_flight += 1
+
+        submitted = time.perf_counter()
+        started = None
+
+        def timed():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        def finished(_):
+            # Runs when the executor job ends, not when the awaiting request does: a client
+            # that disconnects does not free the slot while its hash is still running
+            done = time.perf_counter()
+            with self._lock:
+                self.in_flight -= 1
+                if started is not None:
+                    self.completed += 1
+                    self.total_wait_s += started - submitted
+                    run_s = done - started
+                    self.total_run_s += run_s
+                    self.max_run_s = max(self.max_run_s, run_s)
+
+        try:
+            if self.kind == "process":
+                # Worker-side timing is not observable across processes; count it as run time
+                started = submitted
+                future = asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            else:
+                future = asyncio.get_running_loop().run_in_executor(self._get_executor(), timed)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(finished)
+        # Shielded so cancelling the request does not mark the job done while it still runs
+        return await asyncio.shield(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.total_wait_s / self.completed * 1000 if self.completed else 0.0,
+                "avg_run_ms": self.total_run_s / self.completed * 1000 if self.completed else 0.0,
+                "max_run_ms": self.max_run_s * 1000,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool()
+
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(_hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one uses outdated cost settings."""
+    return await password_pool.run(_verify_and_update, plain_password, hashed_password)
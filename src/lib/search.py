@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, literal_column
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.product import Product
+from src.models.shop import Shop
+from src.schemas.product import SearchFilters
+from src.lib.gemini import get_embedding
+from src.lib.vector_index import (
+    embedding_distance, full_distance, needs_rerank, apply_search_params,
+    VECTOR_INDEX_STORAGE, VECTOR_RERANK_FACTOR,
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LANGUAGE = "english"
+# Generated tsvector column, created by migrations rather than mapped on the model
+SEARCH_VECTOR = literal_column("product.search_vector")
+SEARCH_VECTOR_DDL = (
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_LANGUAGE}', coalesce(name, '') || ' ' || coalesce(description, ''))) STORED"
+)
+
+EMBEDDING_TIMEOUT = float(os.getenv("SEARCH_EMBEDDING_TIMEOUT", 1.0))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_SEARCH_CANDIDATES", 4))  # candidates per pass, as a multiple of limit
+RRF_K = int(os.getenv("HYBRID_SEARCH_RRF_K", 60))
+
+
+def live_products_clause():
+    """Excludes products of soft-deleted shops until src/lib/shop_deletion.py has purged them.
+
+    The subquery reads the small ix_shop_deleted_at partial index and is hashed once per query.
+    """
+    return Product.shop_id.not_in(select(Shop.id).where(Shop.deleted_at.is_not(None)))
+
+
+def filter_clauses(filters: Optional[SearchFilters]) -> list:
+    """SQL conditions for the search filters, so `limit` applies after filtering."""
+    if filters is None:
+        return []
+    clauses = []
+    if filters.shop_id is not None:
+        clauses.append(Product.shop_id == filters.shop_id)
+    if filters.min_price is not None:
+        clauses.append(Product.price >= filters.min_price)
+    if filters.max_price is not None:
+        clauses.append(Product.price <= filters.max_price)
+    if filters.tag:
+        # Shop tags are a free-form JSON string, so match the quoted tag rather than parsing it
+        tag = filters.tag.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append(Product.shop_id.in_(select(Shop.id).where(Shop.tags.ilike(f'%"{tag}"%'))))
+    if filters.collapse_duplicates:
+        clauses.append(Product.duplicate_of.is_(None))
+    return clauses
+
+
+async def lexical_search_ids(session: AsyncSession, q: str, limit: int, filters: Optional[SearchFilters] = None) -> List[UUID]:
+    query = func.websearch_to_tsquery(SEARCH_LANGUAGE, q)
+    stmt = (
+        select(Product.id)
+        .where(SEARCH_VECTOR.op("@@")(query), live_products_clause(), *filter_clauses(filters))
+        .order_by(func.ts_rank_cd(SEARCH_VECTOR, query).desc(), Product.id)
+        .limit(limit)
+    )
+    return list((await session.exec(stmt)).all())
+
+
+def vector_search_stmt(
+    columns,
+    query_embedding,
+    limit: int,
+    filters: Optional[SearchFilters] = None,
+    exact: bool = False,
+    storage: str = VECTOR_INDEX_STORAGE,
+):
+    distance = full_distance(query_embedding) if exact else embedding_distance(query_embedding, storage)
+    conditions = [Product.embedding_status == "ready", live_products_clause(), *filter_clauses(filters)]
+    if exact or not needs_rerank(storage):
+        return (
+            select(*columns, distance.label("distance"))
+            .where(*conditions)
+            .order_by(distance)
+            .limit(limit)
+        )
+
+    # Compact index representations only shortlist candidates; the final order
+    # comes from the full-precision embedding of that shortlist.
+    candidates = (
+        select(Product.id)
+        .where(*conditions)
+        .order_by(distance)
+        .limit(limit * VECTOR_RERANK_FACTOR)
+    )
+    reranked = full_distance(query_embedding)
+    return (
+        select(*columns, reranked.label("distance"))
+        .where(Product.id.in_(candidates.scalar_subquery()))
+        .order_by(reranked)
+        .limit(limit)
+    )
+
+
+def sort_by_distance(rows):
+    # Iterative scans with relaxed ordering may return rows slightly out of order
+    return sorted(rows, key=lambda row: row.distance)
+
+
+async def vector_search_ids(
+    session: AsyncSession,
+    query_embedding,
+    limit: int,
+    filters: Optional[SearchFilters] = None,
+    exact: bool = False,
+) -> List[UUID]:
+    rows = (await session.exec(vector_search_stmt([Product.id], query_embedding, limit, filters, exact=exact))).all()
+    return [row.id for row in sort_by_distance(rows)]
+
+
+def reciprocal_rank_fusion(rankings: List[List[UUID]], k: int = RRF_K) -> List[UUID]:
+    scores: Dict[UUID, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, 1):
+            scores[id] = scores.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+async def hybrid_search_ids(
+    session: AsyncSession,
+    q: str,
+    limit: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+) -> Tuple[List[UUID], bool]:
+    """Fuse lexical and vector rankings, falling back to lexical only if embedding is slow or fails.
+
+    Returns the ids and whether the result is degraded (lexical only).
+    """
+    candidates = limit * HYBRID_CANDIDATES
+    embedding_task = asyncio.create_task(get_embedding(q))
+
+    try:
+        lexical_ids = await lexical_search_ids(session, q, candidates, filters)
+    except BaseException:
+        # Do not leave the embedding call running with nobody to collect its result
+        embedding_task.cancel()
+        await asyncio.gather(embedding_task, return_exceptions=True)
+        raise
+
+    try:
+        query_embedding = await asyncio.wait_for(embedding_task, timeout=EMBEDDING_TIMEOUT)
+    except Exception as e:
+        logger.warning("Embedding unavailable for hybrid search, using lexical results only: %r", e)
+        return lexical_ids[:limit], True
+
+    await apply_search_params(session, ef_search=ef_search, probes=probes, filtered=bool(filter_clauses(filters)))
+    vector_ids = await vector_search_ids(session, query_embedding, candidates, filters)
+    return reciprocal_rank_fusion([lexical_ids, vector_ids])[:limit], False
+
+
+async def fetch_search_results(session: AsyncSession, ids: List[UUID]):
+    if not ids:
+        return []
+    rows = (await session.exec(
+        select(Product.id, Product.name, Product.price, Product.description).where(Product.id.in_(ids))
+    )).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[id] for id in ids if id in by_id]
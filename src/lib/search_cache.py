@@ -0,0 +1,159 @@
+import asyncio
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Awaitable, Callable, Dict, Optional
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "local").lower()  # local | redis | none
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 5000))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 300))
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+
+class SearchCacheBackend(ABC):
+    """Storage for cached search results."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str):
+        ...
+
+
+class LocalSearchCacheBackend(SearchCacheBackend):
+    """In-process LRU with TTL."""
+
+    def __init__(self, maxsize: int = SEARCH_CACHE_SIZE, ttl: int = SEARCH_CACHE_TTL):
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._results.get(key)
+
+    async def set(self, key: str, value: str):
+        with self._lock:
+            self._results[key] = value
+
+
+
+class RedisSearchCacheBackend(SearchCacheBackend):
+    """Shared backend so every API process reuses the same entries (needs the optional `redis` package)."""
+
+    def __init__(self, url: str = SEARCH_CACHE_REDIS_URL, ttl: int = SEARCH_CACHE_TTL):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._client.get(f"search:result:{key}")
+        return value.decode("utf-8") if value is not None else None
+
+    async def set(self, key: str, value: str):
+        await self._client.set(f"search:result:{key}", value, ex=self.ttl)
+
+
+
+class UncachedResult(list):
+    """A result handed to the caller but never stored, e.g. one degraded by a failing dependency."""
+
+
+def result_key(params: dict, versions: Dict[str, int]) -> str:
+    payload = json.dumps({"params": params, "versions": versions}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """Search results cache stamped with catalog versions.
+
+    The versions come from the database (see src/lib/catalog.py), so every
+    process sees a write as soon as it commits. Entries are never deleted on
+    writes; a new version changes the key so stale entries are simply not read
+    again and age out. Concurrent misses for the same key share a single computation.
+    """
+
+    def __init__(self, backend: Optional[SearchCacheBackend]):
+        self.backend = backend
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def get_or_compute(self, params: dict, versions: Optional[Dict[str, int]], compute: Callable[[], Awaitable[list]]) -> list:
+        """Cached result for params at the given catalog versions; versions=None bypasses the cache."""
+        if self.backend is None or versions is None:
+            return await compute()
+
+        key = result_key(params, versions)
+        try:
+            cached = await self.backend.get(key)
+        except Exception:
+            # An unavailable shared backend must not take search down with it
+            self.errors += 1
+            logger.exception("Search cache lookup failed")
+            return await compute()
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fill(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            return await task
+
+        self.coalesced += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+        # The request filling the entry went away, so compute it here instead
+        return await compute()
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[list]]) -> list:
+        value = await compute()
+        if isinstance(value, UncachedResult):
+            return value
+        try:
+            await self.backend.set(key, json.dumps(value, default=str))
+        except Exception:
+            self.errors += 1
+            logger.exception("Search cache store failed")
+        return value
+
+    def stats(self):
+        return {
+            "backend": SEARCH_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+        }
+
+
+def _create_backend() -> Optional[SearchCacheBackend]:
+    if SEARCH_CACHE_BACKEND == "none":
+        return None
+    if SEARCH_CACHE_BACKEND == "redis":
+        return RedisSearchCacheBackend()
+    if SEARCH_CACHE_BACKEND == "local":
+        return LocalSearchCacheBackend()
+    raise ValueError(f"Unsupported SEARCH_CACHE_BACKEND: {SEARCH_CACHE_BACKEND}")
+
+
+search_cache = SearchCache(_create_backend())
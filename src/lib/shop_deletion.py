@@ -0,0 +1,104 @@
+import logging
+import os
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db import async_session_maker
+from src.models.shop import Shop, ShopDeletion, ShopStats
+from src.models.product import Product
+from src.lib.catalog import bump_catalog_version
+from src.lib.chatbot import invalidate_shop_prompt
+from src.lib.neighbors import requeue_referencing
+from src.lib.workers import WorkerPool, run_standalone
+
+logger = logging.getLogger(__name__)
+
+SHOP_DELETION_WORKERS = int(os.getenv("SHOP_DELETION_WORKERS", 1))
+SHOP_DELETION_BATCH_SIZE = int(os.getenv("SHOP_DELETION_BATCH_SIZE", 1000))  # products deleted per transaction
+SHOP_DELETION_POLL_INTERVAL = float(os.getenv("SHOP_DELETION_POLL_INTERVAL", 5.0))
+
+
+async def schedule_shop_deletion(session: AsyncSession, shop: Shop) -> ShopDeletion:
+    """Soft-delete the shop and queue its purge; commits nothing, the caller owns the transaction."""
+    shop.deleted_at = datetime.utcnow()
+    stats = await session.get(ShopStats, shop.id)
+    job = await session.get(ShopDeletion, shop.id)
+    if job is None:
+        job = ShopDeletion(shop_id=shop.id)
+        session.add(job)
+    job.status = "pending"
+    job.products_total = stats.product_count if stats else 0
+    job.products_deleted = 0
+    job.requested_at = datetime.utcnow()
+    job.started_at = job.finished_at = job.error = None
+    # Hides the shop's products from cached searches and chatbot prompts right away
+    await bump_catalog_version(session, shop.id)
+    return job
+
+
+async def process_batch(session: AsyncSession, batch_size: int = SHOP_DELETION_BATCH_SIZE) -> int:
+    """Delete one batch of a queued shop's products; removes the shop itself once it is empty.
+
+    Neighbor lists, duplicate links and shop stats follow through ON DELETE rules and triggers;
+    lists of other products that pointed at the deleted ones are queued for a rebuild.
+    Returns the number of rows deleted, 0 when there was nothing to do.
+    """
+    job = (await session.exec(
+        select(ShopDeletion)
+        .where(ShopDeletion.status.in_(("pending", "running")))
+        .order_by(ShopDeletion.requested_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )).first()
+    if job is None:
+        await session.rollback()
+        return 0
+
+    shop_id = job.shop_id
+    if job.status == "pending":
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+    try:
+        batch = (await session.exec(select(Product.id).where(Product.shop_id == shop_id).limit(batch_size))).all()
+        # Lists of other shops' products lose these neighbors through the cascade, so they are rebuilt
+        await requeue_referencing(session, batch, exclude_shop_id=shop_id)
+        result = await session.execute(delete(Product).where(Product.id.in_(batch)).execution_options(synchronize_session=False))
+        deleted = result.rowcount
+        job.products_deleted += deleted
+        if deleted < batch_size:
+            # Cascades to shopstats; the job row stays for the status endpoint
+            await session.execute(delete(Shop).where(Shop.id == shop_id))
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+            invalidate_shop_prompt(shop_id)
+            logger.info("Deleted shop %s (%d products)", shop_id, job.products_deleted)
+            deleted += 1  # the shop row
+        await session.commit()
+        return deleted
+    except Exception as e:
+        await session.rollback()
+        logger.exception("Deleting shop %s failed", shop_id)
+        async with async_session_maker() as error_session:
+            failed = await error_session.get(ShopDeletion, shop_id)
+            failed.status = "failed"
+            failed.error = str(e)[:1000]
+            await error_session.commit()
+        return 0
+
+
+async def deletion_status(session: AsyncSession, shop_id: UUID):
+    return await session.get(ShopDeletion, shop_id)
+
+
+def worker_pool(workers: int = SHOP_DELETION_WORKERS) -> WorkerPool:
+    return WorkerPool("Shop deletion", process_batch, workers, SHOP_DELETION_POLL_INTERVAL)
+
+
+shop_deletion_workers = worker_pool()
+
+
+if __name__ == "__main__":
+    # Standalone job, for deployments that run the API with SHOP_DELETION_WORKERS=0
+    run_standalone(worker_pool(max(SHOP_DELETION_WORKERS, 1)))
@@ -0,0 +1,150 @@
+from typing import Dict, Optional
+from uuid import UUID
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models.shop import ShopStats
+
+def _create_trigger(name: str, definition: str) -> str:
+    # Checked rather than dropped and recreated, so concurrent startups cannot race
+    return f"""
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = '{name}') THEN
+            CREATE TRIGGER {name} {definition};
+        END IF;
+    END $$
+    """
+
+
+# Statement-level triggers read the changed rows from transition tables, so a bulk
+# import chunk costs one aggregate update per shop. min/max are only recomputed
+# when a removed price was the current bound, through ix_product_shop_id_price.
+SHOP_STATS_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_product_shop_id_price ON product (shop_id, price)",
+    """
+    CREATE OR REPLACE FUNCTION shopstats_add(changed_shops uuid[], counts bigint[], sums float8[], mins float8[], maxes float8[])
+    RETURNS void LANGUAGE sql AS $$
+        UPDATE shopstats s
+        SET product_count = s.product_count + d.n,
+            price_sum = s.price_sum + d.total,
+            price_min = LEAST(s.price_min, d.lo),
+            price_max = GREATEST(s.price_max, d.hi),
+            updated_at = now() AT TIME ZONE 'utc'
+        FROM unnest(changed_shops, counts, sums, mins, maxes) AS d(shop_id, n, total, lo, hi)
+        WHERE s.shop_id = d.shop_id
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION shopstats_remove(changed_shops uuid[], counts bigint[], sums float8[], mins float8[], maxes float8[])
+    RETURNS void LANGUAGE sql AS $$
+        UPDATE shopstats s
+        SET product_count = s.product_count - d.n,
+            price_sum = CASE WHEN s.product_count = d.n THEN 0 ELSE s.price_sum - d.total END,
+            price_min = CASE WHEN d.lo > s.price_min THEN s.price_min
+                        ELSE (SELECT min(p.price) FROM product p WHERE p.shop_id = s.shop_id) END,
+            price_max = CASE WHEN d.hi < s.price_max THEN s.price_max
+                        ELSE (SELECT max(p.price) FROM product p WHERE p.shop_id = s.shop_id) END,
+            updated_at = now() AT TIME ZONE 'utc'
+        FROM unnest(changed_shops, counts, sums, mins, maxes) AS d(shop_id, n, total, lo, hi)
+        WHERE s.shop_id = d.shop_id
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION shopstats_product_changed() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        shops uuid[]; counts bigint[]; sums float8[]; mins float8[]; maxes float8[];
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT array_agg(shop_id), array_agg(n), array_agg(total), array_agg(lo), array_agg(hi)
+            INTO shops, counts, sums, mins, maxes
+            FROM (
+                SELECT shop_id, count(*) AS n, sum(price) AS total, min(price) AS lo, max(price) AS hi
+                FROM old_rows GROUP BY shop_id ORDER BY shop_id
+            ) d;
+            IF shops IS NOT NULL THEN
+                PERFORM shopstats_remove(shops, counts, sums, mins, maxes);
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT array_agg(shop_id), array_agg(n), array_agg(total), array_agg(lo), array_agg(hi)
+            INTO shops, counts, sums, mins, maxes
+            FROM (
+                SELECT shop_id, count(*) AS n, sum(price) AS total, min(price) AS lo, max(price) AS hi
+                FROM new_rows GROUP BY shop_id ORDER BY shop_id
+            ) d;
+            IF shops IS NOT NULL THEN
+                PERFORM shopstats_add(shops, counts, sums, mins, maxes);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION shopstats_price_changed() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM shopstats_remove(ARRAY[OLD.shop_id], ARRAY[1::bigint], ARRAY[OLD.price], ARRAY[OLD.price], ARRAY[OLD.price]);
+        PERFORM shopstats_add(ARRAY[NEW.shop_id], ARRAY[1::bigint], ARRAY[NEW.price], ARRAY[NEW.price], ARRAY[NEW.price]);
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION shopstats_shop_created() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO shopstats (shop_id, product_count, price_sum, updated_at)
+        VALUES (NEW.id, 0, 0, now() AT TIME ZONE 'utc')
+        ON CONFLICT (shop_id) DO NOTHING;
+        RETURN NULL;
+    END
+    $$
+    """,
+    _create_trigger(
+        "shopstats_product_insert",
+        "AFTER INSERT ON product REFERENCING NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION shopstats_product_changed()",
+    ),
+    _create_trigger(
+        "shopstats_product_delete",
+        "AFTER DELETE ON product REFERENCING OLD TABLE AS old_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION shopstats_product_changed()",
+    ),
+    # Transition tables cannot be combined with a column list, and most product updates
+    # are embedding writes, so price and shop changes use a filtered row-level trigger
+    _create_trigger(
+        "shopstats_product_update",
+        "AFTER UPDATE OF price, shop_id ON product FOR EACH ROW "
+        "WHEN (OLD.price IS DISTINCT FROM NEW.price OR OLD.shop_id IS DISTINCT FROM NEW.shop_id) "
+        "EXECUTE FUNCTION shopstats_price_changed()",
+    ),
+    _create_trigger(
+        "shopstats_shop_insert",
+        "AFTER INSERT ON shop FOR EACH ROW EXECUTE FUNCTION shopstats_shop_created()",
+    ),
+    # Shops created before the triggers existed get their row computed once
+    """
+    INSERT INTO shopstats (shop_id, product_count, price_min, price_max, price_sum, updated_at)
+    SELECT shop.id, count(product.id), min(product.price), max(product.price),
+           coalesce(sum(product.price), 0), now() AT TIME ZONE 'utc'
+    FROM shop LEFT JOIN product ON product.shop_id = shop.id
+    WHERE NOT EXISTS (SELECT 1 FROM shopstats WHERE shopstats.shop_id = shop.id)
+    GROUP BY shop.id
+    ON CONFLICT (shop_id) DO NOTHING
+    """,
+]
+
+
+def stats_dict(stats: Optional[ShopStats]) -> Optional[Dict]:
+    """Shape a stats row like ShopStatsResponse."""
+    if stats is None:
+        return None
+    return {
+        "product_count": stats.product_count,
+        "min_price": stats.price_min,
+        "max_price": stats.price_max,
+        "avg_price": stats.price_sum / stats.product_count if stats.product_count else None,
+        "updated_at": stats.updated_at,
+    }
+
+
+async def get_shop_stats(session: AsyncSession, shop_id: UUID) -> Optional[ShopStats]:
+    return await session.get(ShopStats, shop_id)
+
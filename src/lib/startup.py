@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from sqlalchemy import text
+from sqlmodel import select
+from src.db import engine, read_session_maker, prime_pools
+from src.models.product import Product
+from src.lib.embedding_cache import embedding_cache
+from src.lib.gemini import get_client, EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID
+from src.lib.llm import get_llm_backend, LLM_BACKEND
+from src.lib.migrations import run_migrations
+from src.lib.search import vector_search_stmt
+from src.lib.vector_index import VECTOR_INDEX_NAME, apply_search_params
+
+logger = logging.getLogger(__name__)
+
+# Production runs migrations once before the workers start (see gunicorn.conf.py), so workers skip them
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "true").lower() == "true"
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 30.0))
+WARMUP_EMBEDDING_CACHE = int(os.getenv("WARMUP_EMBEDDING_CACHE", 1000))  # recent embeddings loaded into memory
+
+
+class StartupState:
+    """Per-process startup timings, logged once warm and read by the startup benchmark."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            # Warm-up is best effort: a failed phase is reported, the worker still starts serving
+            self.errors[name] = f"{e.__class__.__name__}: {e}"
+            logger.warning("Warm-up phase %s failed: %r", name, e)
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 4)
+
+
+startup = StartupState()
+
+
+def migrate():
+    """Schema setup, skipped when RUN_MIGRATIONS=false; the engine's connections are not kept."""
+    if not RUN_MIGRATIONS:
+        return
+    start = time.perf_counter()
+    run_migrations(engine)
+    engine.dispose()
+    startup.phases["migrations"] = round(time.perf_counter() - start, 4)
+
+
+async def prewarm_vector_index():
+    """Pull the ANN index into shared buffers (pg_prewarm when installed) and run one search."""
+    async with read_session_maker() as session:
+        if (await session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_prewarm'"))).first():
+            if (await session.execute(text("SELECT to_regclass(:name)"), {"name": VECTOR_INDEX_NAME})).scalar():
+                await session.execute(text("SELECT pg_prewarm(CAST(:name AS regclass))"), {"name": VECTOR_INDEX_NAME})
+        sample = (await session.exec(
+            select(Product.embedding).where(Product.embedding_status == "ready").limit(1)
+        )).first()
+        if sample is not None:
+            await apply_search_params(session)
+            await session.exec(vector_search_stmt([Product.id], sample, 10))
+        await session.rollback()
+
+
+async def warm_clients():
+    get_llm_backend()
+    # Both the embedding provider and the LLM backend share the Gemini client
+    if EMBEDDING_PROVIDER == "gemini" or LLM_BACKEND == "gemini":
+        get_client()
+
+
+async def warm_up():
+    """Prime pools, caches and index pages.
+
+    Awaited in the lifespan before the server starts accepting connections, so a
+    worker never takes traffic cold; bounded by WARMUP_TIMEOUT.
+    """
+    if WARMUP_ENABLED:
+        async def run_phases():
+            async with startup.phase("pools"):
+                await prime_pools()
+            async with startup.phase("clients"):
+                await warm_clients()
+            async with startup.phase("embedding_cache"):
+                await embedding_cache.preload(EMBEDDING_MODEL_ID, WARMUP_EMBEDDING_CACHE)
+            async with startup.phase("vector_index"):
+                await prewarm_vector_index()
+
+        try:
+            await asyncio.wait_for(run_phases(), WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            startup.errors["timeout"] = f"warm-up exceeded {WARMUP_TIMEOUT}s"
+            logger.warning("Warm-up exceeded %ss, serving anyway", WARMUP_TIMEOUT)
+    logger.info("Worker warm: %s", startup.phases)
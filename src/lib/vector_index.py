@@ -0,0 +1,154 @@
+import os
+from typing import Optional
+from sqlalchemy import cast, func, literal_column, text
+from pgvector.sqlalchemy import BIT, HALFVEC
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.constants import EMBEDDING_DIMENSIONS
+from src.models.product import Product
+from src.lib.gemini import embedding_model_id, EMBEDDING_MODEL_ID
+
+# pgvector can only index `vector` columns up to 2000 dimensions, so the ANN
+# index is built on a halfvec projection of the embedding (up to 4000 dims).
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()  # hnsw | ivfflat | none
+VECTOR_INDEX_NAME = "ix_product_embedding_ann"
+HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", 64))
+IVFFLAT_LISTS = int(os.getenv("VECTOR_INDEX_IVFFLAT_LISTS", 100))
+# Iterative index scans (pgvector 0.8+) keep scanning the index until filtered
+# queries have enough rows, instead of filtering a fixed ef_search/probes candidate set.
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order").lower()  # relaxed_order | strict_order | off
+# What the index stores for each embedding:
+#   halfvec   - all dimensions at half precision, distances are close enough to use as-is
+#   truncated - the leading Matryoshka dimensions at half precision, re-ranked at full precision
+#   binary    - one bit per dimension compared by Hamming distance, re-ranked at full precision
+VECTOR_INDEX_STORAGE = os.getenv("VECTOR_INDEX_STORAGE", "halfvec").lower()
+VECTOR_INDEX_TRUNCATED_DIMENSIONS = min(int(os.getenv("VECTOR_INDEX_TRUNCATED_DIMENSIONS", 768)), EMBEDDING_DIMENSIONS)
+VECTOR_RERANK_FACTOR = int(os.getenv("VECTOR_RERANK_FACTOR", 4))  # first-pass candidates, as a multiple of limit
+VECTOR_INDEX_STORAGES = ("halfvec", "truncated", "binary")
+
+
+def index_expression(storage: str = VECTOR_INDEX_STORAGE):
+    """SQL expression and operator class the ANN index is built on."""
+    if storage == "halfvec":
+        return f"(embedding::halfvec({EMBEDDING_DIMENSIONS}))", "halfvec_cosine_ops"
+    if storage == "truncated":
+        dims = VECTOR_INDEX_TRUNCATED_DIMENSIONS
+        return f"(subvector(embedding, 1, {dims})::halfvec({dims}))", "halfvec_cosine_ops"
+    if storage == "binary":
+        return f"(binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS}))", "bit_hamming_ops"
+    raise ValueError(f"Unsupported VECTOR_INDEX_STORAGE: {storage}")
+
+
+def needs_rerank(storage: str = VECTOR_INDEX_STORAGE) -> bool:
+    return storage != "halfvec"
+
+
+def embedding_distance(query_embedding, storage: str = VECTOR_INDEX_STORAGE):
+    """Distance expression matching the ANN index expression, so the planner can use the index."""
+    if storage == "halfvec":
+        return cast(Product.embedding, HALFVEC(EMBEDDING_DIMENSIONS)).cosine_distance(
+            cast(query_embedding, HALFVEC(EMBEDDING_DIMENSIONS))
+        )
+    if storage == "truncated":
+        dims = VECTOR_INDEX_TRUNCATED_DIMENSIONS
+        # Inline the bounds: the planner only matches the index expression against constants
+        leading = func.subvector(Product.embedding, literal_column("1"), literal_column(str(dims)))
+        return cast(leading, HALFVEC(dims)).cosine_distance(
+            cast(list(query_embedding)[:dims], HALFVEC(dims))
+        )
+    if storage == "binary":
+        query_bits = "".join("1" if value > 0 else "0" for value in query_embedding)
+        return cast(func.binary_quantize(Product.embedding), BIT(EMBEDDING_DIMENSIONS)).hamming_distance(
+            cast(query_bits, BIT(EMBEDDING_DIMENSIONS))
+        )
+    raise ValueError(f"Unsupported VECTOR_INDEX_STORAGE: {storage}")
+
+
+def full_distance(query_embedding):
+    """Exact cosine distance on the stored embedding, used to re-rank first-pass candidates."""
+    return Product.embedding.cosine_distance(query_embedding)
+
+
+def create_vector_index(connection):
+    if VECTOR_INDEX_TYPE == "none":
+        connection.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+        return
+
+    if VECTOR_INDEX_TYPE == "hnsw":
+        method = "hnsw"
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    elif VECTOR_INDEX_TYPE == "ivfflat":
+        method = "ivfflat"
+        options = f"lists = {IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Unsupported VECTOR_INDEX_TYPE: {VECTOR_INDEX_TYPE}")
+
+    expression, opclass = index_expression()
+    definition = f"USING {method} ({expression} {opclass}) WITH ({options})"
+
+    # The definition is stored as the index comment, so any change to it triggers a rebuild
+    existing = connection.execute(
+        text("SELECT obj_description(to_regclass(:name), 'pg_class')"),
+        {"name": VECTOR_INDEX_NAME},
+    ).scalar()
+    if existing == definition:
+        return
+    connection.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+    connection.execute(text(f"CREATE INDEX {VECTOR_INDEX_NAME} ON product {definition}"))
+    connection.execute(text(f"COMMENT ON INDEX {VECTOR_INDEX_NAME} IS :definition"), {"definition": definition})
+
+
+def resize_embedding_columns(connection):
+    """Match stored embedding columns to EMBEDDING_DIMENSIONS.
+
+    Matryoshka embeddings can be shortened by keeping their leading dimensions, so
+    shrinking keeps product embeddings. Growing cannot, so products go back to the
+    embedding queue. Cached embeddings are keyed per size and are simply dropped.
+    """
+    current = connection.execute(text(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = 'product'::regclass AND attname = 'embedding' AND NOT attisdropped"
+    )).scalar()
+    if current is None or current == EMBEDDING_DIMENSIONS:
+        return
+
+    connection.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+    if current > EMBEDDING_DIMENSIONS:
+        connection.execute(text(
+            f"ALTER TABLE product ALTER COLUMN embedding TYPE vector({EMBEDDING_DIMENSIONS}) "
+            f"USING l2_normalize(subvector(embedding, 1, {EMBEDDING_DIMENSIONS}))"
+        ))
+        # The shortened vectors now belong to the new size, so reembed must not queue them again
+        connection.execute(
+            text("UPDATE product SET embedding_model = :new_id WHERE embedding_model = :old_id"),
+            {"new_id": EMBEDDING_MODEL_ID, "old_id": embedding_model_id(current)},
+        )
+    else:
+        connection.execute(text(
+            f"ALTER TABLE product ALTER COLUMN embedding TYPE vector({EMBEDDING_DIMENSIONS}) USING NULL"
+        ))
+        connection.execute(text(
+            "UPDATE product SET embedding_status = 'pending', embedding_model = NULL, reembed_requested = FALSE, "
+            "embedding_attempts = 0, embedding_next_attempt_at = NULL, embedding_error = NULL"
+        ))
+    connection.execute(text("DELETE FROM embeddingcache"))
+    connection.execute(text(
+        f"ALTER TABLE embeddingcache ALTER COLUMN embedding TYPE vector({EMBEDDING_DIMENSIONS})"
+    ))
+
+
+async def apply_search_params(session: AsyncSession, ef_search: Optional[int] = None, probes: Optional[int] = None, filtered: bool = False):
+    # SET LOCAL only lasts for the current transaction, so pooled connections stay clean
+    if filtered and VECTOR_ITERATIVE_SCAN != "off":
+        await session.execute(text(f"SET LOCAL hnsw.iterative_scan = {VECTOR_ITERATIVE_SCAN}"))
+        # ivfflat only supports relaxed ordering
+        await session.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+    if ef_search is not None:
+        await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+    if probes is not None:
+        await session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+
+
+async def disable_index_scans(session: AsyncSession):
+    await session.execute(text("SET LOCAL enable_indexscan = off"))
+    await session.execute(text("SET LOCAL enable_bitmapscan = off"))
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Polling background tasks for the Postgres-backed job queues.
+
+    Each task calls run_once with a fresh session in a loop and sleeps for
+    poll_interval whenever it reports no work (0 rows processed). Failures are
+    logged and treated as an idle round.
+    """
+
+    def __init__(self, name: str, run_once: Callable[[AsyncSession], Awaitable[int]], workers: int, poll_interval: float):
+        self.name = name
+        self.run_once = run_once
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+
+    async def _run(self, number: int):
+        while True:
+            try:
+                async with async_session_maker() as session:
+                    processed = await self.run_once(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s worker %d failed", self.name, number)
+                processed = 0
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        for number in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._run(number)))
+
+    async def join(self):
+        """Wait for the tasks; they only end when cancelled."""
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+def run_standalone(pool: WorkerPool):
+    """Run a pool as its own process, for deployments that disable it in the API (workers=0)."""
+    async def main():
+        pool.start()
+        await pool.join()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
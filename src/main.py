@@ -1,23 +1,39 @@
 from fastapi import FastAPI, Request
-from sqlmodel import SQLModel
-from src.db import engine
+from src.db import dispose_engines, pool_stats, check_database_health
+from src.lib.startup import migrate, warm_up
+from src.lib.passwords import password_pool
+from src.lib.embedding_worker import embedding_workers
+from src.lib.neighbors import neighbor_workers
+from src.lib.shop_deletion import shop_deletion_workers
+from src.lib.metrics import MetricsMiddleware, DB_POOL_CONNECTIONS, PASSWORD_POOL_TASKS, PASSWORD_POOL_SECONDS, render_metrics
 from src.routes.product import router as product_router
 from src.routes.user import router as user_router
 from src.routes.chat import router as chat_router
 from src.routes.shop import router as shop_router
 from contextlib import asynccontextmanager
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from datetime import datetime
 
-# Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    # Schema setup runs here in development; production runs it once before forking workers
+    migrate()
+    embedding_workers.start()
+    neighbor_workers.start()
+    shop_deletion_workers.start()
+    # Connections are only accepted once the lifespan has started, so the worker takes traffic warm
+    await warm_up()
     yield
+    await shop_deletion_workers.stop()
+    await neighbor_workers.stop()
+    await embedding_workers.stop()
+    await dispose_engines()
+    password_pool.shutdown()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(MetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 templates = Jinja2Templates(directory="src/templates")
@@ -30,6 +46,29 @@ async def root(request: Request):
 async def about(request: Request):
     return templates.TemplateResponse("about.html", {"request": request, "year": datetime.now().year})
 
+@app.get("/healthz")
+async def healthz():
+    databases = await check_database_health()
+    healthy = all(status == "ok" for status in databases.values())
+    return JSONResponse(
+        {"status": "ok" if healthy else "degraded", "databases": databases, "pools": pool_stats()},
+        status_code=200 if healthy else 503,
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition for this process."""
+    for pool, stats in pool_stats().items():
+        DB_POOL_CONNECTIONS.set(stats["checked_out"], pool=pool, state="checked_out")
+        DB_POOL_CONNECTIONS.set(stats["checked_in"], pool=pool, state="checked_in")
+        DB_POOL_CONNECTIONS.set(stats["overflow"], pool=pool, state="overflow")
+    hashing = password_pool.stats()
+    for state in ("in_flight", "completed", "rejected"):
+        PASSWORD_POOL_TASKS.set(hashing[state], state=state)
+    for stat in ("avg_wait", "avg_run", "max_run"):
+        PASSWORD_POOL_SECONDS.set(hashing[f"{stat}_ms"] / 1000, stat=stat)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(product_router)
 app.include_router(user_router)
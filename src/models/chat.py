@@ -2,9 +2,12 @@ from sqlmodel import SQLModel, Field, Relationship
 from uuid import uuid4, UUID
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 from src.models.user import User
 
 class ChatMessage(SQLModel, table=True):
+    __table_args__ = (Index("ix_chatmessage_user_id_timestamp", "user_id", "timestamp", "id"),)
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id")
     message: str
@@ -12,4 +15,14 @@ class ChatMessage(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
     # Relationship back to user
-    user: Optional[User] = Relationship(back_populates="messages")
\ No newline at end of file
+    user: Optional[User] = Relationship(back_populates="messages")
+
+class ChatSummary(SQLModel, table=True):
+    # Rolling summary of the turns that have dropped out of the prompt window
+    user_id: UUID = Field(foreign_key="user.id", primary_key=True)
+    summary: str = ""
+    # (timestamp, id) of the last message rolled into the summary; messages can share a timestamp
+    summarized_until: Optional[datetime] = None
+    summarized_until_id: Optional[UUID] = None
+    summarized_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
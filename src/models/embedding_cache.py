@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from src.constants import EMBEDDING_DIMENSIONS
+from sqlalchemy import Column
+
+class EmbeddingCache(SQLModel, table=True):
+    key: str = Field(primary_key=True)  # sha256 of model name + normalized text
+    model: str = Field(index=True)
+    embedding: Optional[list] = Field(sa_column=Column(Vector(EMBEDDING_DIMENSIONS)))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -2,18 +2,75 @@ from sqlmodel import SQLModel, Field, Relationship
 from uuid import uuid4, UUID
 from typing import Optional, List, TYPE_CHECKING
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column
+from src.constants import EMBEDDING_DIMENSIONS
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from datetime import datetime
 
 if TYPE_CHECKING:
     from .shop import Shop
 
 class Product(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_product_created_at_id", "created_at", "id"),
+        Index(
+            "ix_product_embedding_pending",
+            "embedding_next_attempt_at",
+            postgresql_where=text("embedding_status = 'pending'"),
+        ),
+        Index(
+            "ix_product_reembed_pending",
+            "embedding_next_attempt_at",
+            postgresql_where=text("reembed_requested"),
+        ),
+        Index(
+            "ix_product_neighbors_pending",
+            "created_at",
+            postgresql_where=text("neighbors_updated_at IS NULL AND embedding_status = 'ready'"),
+        ),
+        Index("ix_product_shop_id_price", "shop_id", "price"),  # shop price bounds, see src/lib/shop_stats.py
+        Index("ix_product_shop_content_hash", "shop_id", "content_hash"),
+        Index("ix_product_simhash_bands", "simhash_bands", postgresql_using="gin"),
+        Index("ix_product_duplicate_of", "duplicate_of", postgresql_where=text("duplicate_of IS NOT NULL")),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
     description: str
-    price: float
-    shop_id: UUID = Field(foreign_key="shop.id")
-    embedding: Optional[list] = Field(sa_column=Column(Vector(3072)))
+    price: float = Field(index=True)
+    shop_id: UUID = Field(foreign_key="shop.id", index=True, ondelete="CASCADE")
+    embedding: Optional[list] = Field(sa_column=Column(Vector(EMBEDDING_DIMENSIONS)))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # Embedding queue state, see src/lib/embedding_worker.py
+    embedding_status: str = Field(default="pending")  # pending | ready | failed
+    embedding_model: Optional[str] = None
+    embedding_attempts: int = Field(default=0)
+    embedding_next_attempt_at: Optional[datetime] = None
+    embedding_error: Optional[str] = None
+    # Re-embedding with a new model; the old vector stays ready and searchable until it is replaced
+    reembed_requested: bool = Field(default=False)
+
+    # When the precomputed neighbor lists were last rebuilt; NULL queues the product, see src/lib/neighbors.py
+    neighbors_updated_at: Optional[datetime] = None
+
+    # Ingest-time deduplication, see src/lib/dedup.py
+    content_hash: Optional[str] = None
+    simhash: Optional[int] = Field(default=None, sa_column=Column(BigInteger))
+    simhash_bands: Optional[List[int]] = Field(default=None, sa_column=Column(ARRAY(Integer)))  # shop-keyed band keys
+    duplicate_of: Optional[UUID] = Field(default=None, sa_column=Column(ForeignKey("product.id", ondelete="SET NULL")))
 
     # Relationship back to shop
-    shop: Optional["Shop"] = Relationship(back_populates="products")
\ No newline at end of file
+    shop: Optional["Shop"] = Relationship(back_populates="products")
+
+class ProductNeighbor(SQLModel, table=True):
+    # Precomputed nearest neighbors; read ordered by distance through the primary lookup index
+    __table_args__ = (
+        Index("ix_productneighbor_lookup", "product_id", "scope", "distance"),
+        Index("ix_productneighbor_neighbor_id", "neighbor_id"),  # reverse lookups and cascading deletes
+    )
+
+    product_id: UUID = Field(sa_column=Column(ForeignKey("product.id", ondelete="CASCADE"), primary_key=True))
+    scope: str = Field(primary_key=True)  # all | shop
+    neighbor_id: UUID = Field(sa_column=Column(ForeignKey("product.id", ondelete="CASCADE"), primary_key=True))
+    distance: float
\ No newline at end of file
@@ -2,15 +2,45 @@ from sqlmodel import SQLModel, Field, Relationship
 from uuid import uuid4, UUID
 from typing import Optional, List, TYPE_CHECKING
 from datetime import datetime
+from sqlalchemy import Column, ForeignKey, Index, text
 from src.models.product import Product
 
 class Shop(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_shop_created_at_id", "created_at", "id"),
+        Index("ix_shop_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        # Names are unique among live shops, so a soft-deleted shop's name is free right away
+        Index("ix_shop_name_live", "name", unique=True, postgresql_where=text("deleted_at IS NULL")),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    name: str = Field(unique=True, index=True)
+    name: str
     description: Optional[str] = None
     tags: Optional[str] = None  # JSON string for tags
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    catalog_version: int = Field(default=0)  # bumped on every product write
+    deleted_at: Optional[datetime] = None  # soft delete; rows are purged by src/lib/shop_deletion.py
+
+    # Relationship to products; the database cascades deletes, so the ORM never loads them for it
+    products: List["Product"] = Relationship(back_populates="shop", passive_deletes="all")
+
+class ShopStats(SQLModel, table=True):
+    # Catalog aggregates kept up to date by triggers on product, see src/lib/shop_stats.py
+    shop_id: UUID = Field(sa_column=Column(ForeignKey("shop.id", ondelete="CASCADE"), primary_key=True))
+    product_count: int = Field(default=0)
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    price_sum: float = Field(default=0.0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # last product insert, update or delete
 
-    # Relationship to products
-    products: List["Product"] = Relationship(back_populates="shop")
\ No newline at end of file
+class ShopDeletion(SQLModel, table=True):
+    # Progress of a background shop deletion; kept after the shop row is gone
+    shop_id: UUID = Field(primary_key=True)
+    status: str = Field(default="pending")  # pending | running | done | failed
+    products_total: int = Field(default=0)
+    products_deleted: int = Field(default=0)
+    requested_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
@@ -1,43 +1,126 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from typing import List
-from src.db import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+import json
+import logging
+from src.db import get_session, async_session_maker
 from src.models.chat import ChatMessage
-from src.models.user import User
+from src.schemas.user import TokenUser
+from src.models.shop import Shop
 from src.schemas.chat import ChatMessageResponse, CreateChatMessageRequest
-from src.lib.auth import get_current_user
+from src.lib.auth import get_token_user
 from src.constants import API_VERSION
-from src.lib.chatbot import generate_generic_system_prompt
+from src.lib.export import ndjson_export
+from src.lib.pagination import keyset_paginate, next_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.lib.chatbot import generate_generic_system_prompt, build_shop_system_prompt
+from src.lib.llm import get_llm_backend
+from src.lib.chat_history import recent_messages, refresh_summary
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix=f"/api/{API_VERSION}/chat", tags=["Chat"])
 
 @router.get("/", response_model=List[ChatMessageResponse])
-def get_chat_messages(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    messages = session.exec(
-        select(ChatMessage).where(ChatMessage.user_id == current_user.id)
-    ).all()
+async def get_chat_messages(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: TokenUser = Depends(get_token_user),
+    session: AsyncSession = Depends(get_session),
+):
+    stmt = keyset_paginate(
+        select(ChatMessage).where(ChatMessage.user_id == current_user.id),
+        ChatMessage.timestamp, ChatMessage.id, cursor, limit,
+    )
+    messages, next_page = next_cursor((await session.exec(stmt)).all(), limit, created_key="timestamp")
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
     return messages
 
-@router.post("/")
-def create_chat_message(
+@router.get("/export")
+async def export_chat_messages(request: Request, current_user: TokenUser = Depends(get_token_user)):
+    """Stream the current user's chat history as NDJSON (gzip with Accept-Encoding: gzip)."""
+    stmt = (
+        select(ChatMessage.id, ChatMessage.user_id, ChatMessage.message, ChatMessage.response, ChatMessage.timestamp)
+        .where(ChatMessage.user_id == current_user.id)
+        .order_by(ChatMessage.timestamp, ChatMessage.id)
+    )
+    return ndjson_export(request, stmt, "chat-history.ndjson")
+
+async def build_prompt(session: AsyncSession, user: TokenUser, message_data: CreateChatMessageRequest) -> str:
+    summary = await refresh_summary(session, user.id)
+    messages = await recent_messages(session, user.id)
+    conversation_summary = summary.summary if summary else None
+
+    if message_data.shop_id:
+        shop = (await session.exec(select(Shop).where(Shop.id == message_data.shop_id, Shop.deleted_at.is_(None)))).first()
+        if not shop:
+            raise HTTPException(status_code=404, detail="Shop not found")
+        return await build_shop_system_prompt(
+            session, shop, messages, message_data.message, conversation_summary=conversation_summary
+        )
+
+    return generate_generic_system_prompt(
+        messages,
+        message_data.message,
+        conversation_summary=conversation_summary,
+    )
+
+async def save_chat_message(user_id, message: str, response: str) -> ChatMessage:
+    async with async_session_maker() as session:
+        db_message = ChatMessage(user_id=user_id, message=message, response=response)
+        session.add(db_message)
+        await session.commit()
+        await session.refresh(db_message)
+        return db_message
+
+@router.post("/", response_model=ChatMessageResponse)
+async def create_chat_message(
     message_data: CreateChatMessageRequest,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: TokenUser = Depends(get_token_user),
+    session: AsyncSession = Depends(get_session)
 ):
-    messages = session.exec(
-        select(ChatMessage).where(ChatMessage.user_id == current_user.id)
-    ).all()
-    
-    response = generate_generic_system_prompt(messages, message_data)
-    
-    print(response)
-
-    # db_message = ChatMessage(
-    #     user_id=current_user.id,
-    #     message=message_data.message,
-    #     response=response
-    # )
-    # session.add(db_message)
-    # session.commit()
-    # session.refresh(db_message)
-    return response
\ No newline at end of file
+    system_prompt = await build_prompt(session, current_user, message_data)
+    response = await get_llm_backend().complete(system_prompt, message_data.message)
+    return await save_chat_message(current_user.id, message_data.message, response)
+
+@router.post("/stream")
+async def stream_chat_message(
+    message_data: CreateChatMessageRequest,
+    current_user: TokenUser = Depends(get_token_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """Stream the reply as Server-Sent Events; the turn is saved after the stream completes."""
+    system_prompt = await build_prompt(session, current_user, message_data)
+    user_id = current_user.id
+    deltas = []
+    completed = False
+
+    async def events():
+        nonlocal completed
+        try:
+            async for delta in get_llm_backend().stream(system_prompt, message_data.message):
+                deltas.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except Exception:
+            # Provider errors can carry internal details, so the client only gets a generic code
+            logger.exception("Chat completion failed")
+            yield f"event: error\ndata: {json.dumps({'code': 'completion_failed', 'detail': 'The reply could not be generated'})}\n\n"
+            return
+        completed = True
+        yield "event: done\ndata: {}\n\n"
+
+    async def persist():
+        # Skip turns that were cut off by an error or a client disconnect
+        if completed:
+            await save_chat_message(user_id, message_data.message, "".join(deltas))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(persist),
+    )
@@ -1,51 +1,261 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Literal, Optional
+from uuid import UUID
+import logging
+import time
 
 from src.models.product import Product
 from src.models.shop import Shop
-from src.db import get_session
+from src.db import get_session, get_read_session
 from src.lib.gemini import get_embedding
-from src.schemas.product import ProductResponse, CreateProductRequest, ProductSearchResponse, ProductWithShopResponse
+from src.lib.embedding_cache import embedding_cache, normalize_text
+from src.lib.bulk_import import iter_records, validate_record, import_chunk, format_validation_error, BULK_IMPORT_CHUNK_SIZE
+from src.lib.catalog import bump_catalog_version, catalog_versions
+from src.lib.embedding_worker import queue_stats, queue_reembed
+from src.lib.export import ndjson_export
+from src.lib.search_cache import search_cache, UncachedResult
+from src.lib.dedup import apply_dedup, reuse_embeddings, DEDUP_MODE
+from src.lib.neighbors import similar_products, neighbors_stats, NEIGHBORS_K
+from src.lib.pagination import keyset_paginate, next_cursor, parse_fields, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.lib.search import (
+    filter_clauses, live_products_clause, lexical_search_ids, vector_search_ids, vector_search_stmt, sort_by_distance,
+    hybrid_search_ids, fetch_search_results,
+)
+from src.lib.vector_index import apply_search_params, disable_index_scans
+from src.schemas.product import ProductResponse, CreateProductRequest, ProductSearchResponse, ProductListResponse, SearchRecallReport, SearchFilters, BulkImportResponse, SimilarProductResponse
 from src.constants import API_VERSION
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix=f"/api/{API_VERSION}/products", tags=["Products"])
 
-@router.get("/", response_model=List[ProductWithShopResponse])
-def get_products(session: Session = Depends(get_session)):
-    products = session.exec(select(Product)).all()
-    return products
+PRODUCT_LIST_FIELDS = ("id", "name", "description", "price", "shop_id", "created_at", "shop")
+PRODUCT_LIST_DEFAULT_FIELDS = ("id", "name", "description", "price", "shop")
+SHOP_FIELDS = ("id", "name", "description", "tags", "created_at", "updated_at")
+
+@router.get("/", response_model=List[ProductListResponse], response_model_exclude_unset=True)
+async def get_products(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    selected = parse_fields(fields, PRODUCT_LIST_FIELDS, PRODUCT_LIST_DEFAULT_FIELDS)
+
+    # Select plain columns (never the embedding) and join the shop in the same query
+    columns = [Product.id, Product.created_at]
+    columns += [getattr(Product, field) for field in selected if field not in ("id", "created_at", "shop")]
+    if "shop" in selected:
+        columns += [getattr(Shop, field).label(f"shop__{field}") for field in SHOP_FIELDS]
+    stmt = select(*columns).where(live_products_clause())
+    if "shop" in selected:
+        stmt = stmt.join(Shop, Shop.id == Product.shop_id)
+    stmt = keyset_paginate(stmt, Product.created_at, Product.id, cursor, limit)
+
+    rows, next_page = next_cursor((await session.exec(stmt)).all(), limit)
+
+    products = []
+    for row in rows:
+        mapping = row._mapping
+        item = {field: mapping[field] for field in selected if field != "shop"}
+        if "shop" in selected:
+            item["shop"] = {field: mapping[f"shop__{field}"] for field in SHOP_FIELDS}
+        products.append(item)
+    # Rows are already shaped like ProductListResponse, so skip re-validating them
+    headers = {"X-Next-Cursor": next_page} if next_page else None
+    return ORJSONResponse(products, headers=headers)
 
 @router.post("/", response_model=ProductResponse)
-def create_product(product: CreateProductRequest, session: Session = Depends(get_session)):
+async def create_product(product: CreateProductRequest, session: AsyncSession = Depends(get_session)):
     # Validate that the shop exists
-    shop = session.exec(select(Shop).where(Shop.id == product.shop_id)).first()
+    shop = (await session.exec(select(Shop).where(Shop.id == product.shop_id, Shop.deleted_at.is_(None)))).first()
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
 
-    embedding = get_embedding(product.name + " " + product.description)
-
-    db_product = Product(
-        **product.dict(),
-        embedding=embedding
-    )
+    # The embedding is filled in by the background queue, or copied from the product this duplicates
+    db_product = Product(**product.dict())
+    row = db_product.model_dump(include={"id", "name", "description"})
+    matches = await apply_dedup(session, db_product.shop_id, [row])
+    if matches and DEDUP_MODE == "reject":
+        raise HTTPException(status_code=409, detail=f"Duplicate of product {matches[0].canonical_id}")
+    for field in ("content_hash", "simhash", "simhash_bands", "duplicate_of"):
+        setattr(db_product, field, row.get(field))
 
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    if db_product.duplicate_of is not None:
+        await session.flush()
+        await reuse_embeddings(session, [db_product.id])
+    await bump_catalog_version(session, db_product.shop_id)
+    await session.commit()
+    await session.refresh(db_product)
     return db_product
 
-@router.get("/search", response_model=List[ProductSearchResponse])
-def search_products(q: str, limit: int = 10, session: Session = Depends(get_session)):
-    query_embedding = get_embedding(q)
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_import_products(request: Request, shop_id: UUID, session: AsyncSession = Depends(get_session)):
+    """Import products from a JSON array, NDJSON or CSV body into one shop."""
+    shop = (await session.exec(select(Shop).where(Shop.id == shop_id, Shop.deleted_at.is_(None)))).first()
+    if not shop:
+        raise HTTPException(status_code=404, detail="Shop not found")
+
+    total = inserted = 0
+    errors = []
+    chunk = []
+
+    async def flush():
+        nonlocal inserted
+        chunk_errors = await import_chunk(session, shop_id, chunk)
+        inserted += len(chunk) - len(chunk_errors)
+        errors.extend(chunk_errors)
+        logger.info("Bulk import into shop %s: %d rows processed, %d inserted, %d failed", shop_id, total, inserted, len(errors))
+        chunk.clear()
+
+    try:
+        async for row, record in iter_records(request):
+            total += 1
+            try:
+                chunk.append((row, validate_record(record)))
+            except (ValueError, ValidationError) as e:
+                errors.append({"row": row, "error": format_validation_error(e)})
+                continue
+            if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                await flush()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if chunk:
+        await flush()
+
+    return BulkImportResponse(
+        shop_id=shop_id,
+        total=total,
+        inserted=inserted,
+        failed=len(errors),
+        errors=errors,
+    )
+
+@router.get("/export")
+async def export_products(request: Request, shop_id: UUID, session: AsyncSession = Depends(get_read_session)):
+    """Stream a shop's products as NDJSON (gzip with Accept-Encoding: gzip)."""
+    # Checked up front: once streaming starts the status code can no longer change
+    shop = (await session.exec(select(Shop.id).where(Shop.id == shop_id, Shop.deleted_at.is_(None)))).first()
+    if not shop:
+        raise HTTPException(status_code=404, detail="Shop not found")
 
-    # Query only name and price
     stmt = (
-        select(Product.name, Product.price, Product.description)
-        .order_by(Product.embedding.cosine_distance(query_embedding))
-        .limit(limit)
+        select(Product.id, Product.name, Product.description, Product.price, Product.shop_id, Product.created_at)
+        .where(Product.shop_id == shop_id, live_products_clause())
+        .order_by(Product.created_at, Product.id)
+    )
+    return ndjson_export(request, stmt, f"products-{shop_id}.ndjson")
+
+@router.get("/search", response_model=List[ProductSearchResponse])
+async def search_products(
+    q: str,
+    limit: int = 10,
+    ef_search: Optional[int] = Query(None, ge=1, le=1000),
+    probes: Optional[int] = Query(None, ge=1, le=10000),
+    mode: Literal["vector", "lexical", "hybrid"] = "vector",
+    filters: SearchFilters = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    async def run_search():
+        degraded = False
+        if mode == "lexical":
+            rows = await fetch_search_results(session, await lexical_search_ids(session, q, limit, filters))
+        elif mode == "hybrid":
+            ids, degraded = await hybrid_search_ids(session, q, limit, ef_search=ef_search, probes=probes, filters=filters)
+            rows = await fetch_search_results(session, ids)
+        else:
+            query_embedding = await get_embedding(q)
+            await apply_search_params(session, ef_search=ef_search, probes=probes, filtered=bool(filter_clauses(filters)))
+
+            # Query only name and price
+            stmt = vector_search_stmt([Product.name, Product.price, Product.description], query_embedding, limit, filters)
+            rows = sort_by_distance((await session.exec(stmt)).all())
+        results = [{"name": row.name, "price": row.price, "description": row.description} for row in rows]
+        # Lexical-only fallback results must not be served as hybrid ones for the cache TTL
+        return UncachedResult(results) if degraded else results
+
+    params = {
+        "q": normalize_text(q),
+        "limit": limit,
+        "mode": mode,
+        "ef_search": ef_search,
+        "probes": probes,
+        "filters": filters.model_dump(),
+    }
+    return await search_cache.get_or_compute(params, await catalog_versions(session, filters.shop_id), run_search)
+
+@router.get("/search/recall", response_model=SearchRecallReport)
+async def search_recall(
+    q: str,
+    limit: int = 10,
+    ef_search: Optional[int] = Query(None, ge=1, le=1000),
+    probes: Optional[int] = Query(None, ge=1, le=10000),
+    filters: SearchFilters = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Compare ANN results against an exact (sequential scan) search for the same query."""
+    query_embedding = await get_embedding(q)
+
+    await apply_search_params(session, ef_search=ef_search, probes=probes, filtered=bool(filter_clauses(filters)))
+    start = time.perf_counter()
+    ann_ids = await vector_search_ids(session, query_embedding, limit, filters)
+    ann_ms = (time.perf_counter() - start) * 1000
+
+    await disable_index_scans(session)
+    start = time.perf_counter()
+    exact_ids = await vector_search_ids(session, query_embedding, limit, filters, exact=True)
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    recall = len(set(ann_ids) & set(exact_ids)) / len(exact_ids) if exact_ids else 1.0
+
+    return SearchRecallReport(
+        query=q,
+        limit=limit,
+        ef_search=ef_search,
+        probes=probes,
+        recall=recall,
+        ann_ms=ann_ms,
+        exact_ms=exact_ms,
+        ann_ids=ann_ids,
+        exact_ids=exact_ids,
     )
 
-    results = session.exec(stmt).all()
+@router.get("/{product_id}/similar", response_model=List[SimilarProductResponse])
+async def get_similar_products(
+    product_id: UUID,
+    limit: int = Query(10, ge=1, le=NEIGHBORS_K),
+    scope: Literal["all", "shop"] = "all",
+    price_band: Optional[float] = Query(None, ge=0, le=1, description="Only neighbors within this fraction of the product's price"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Nearest products from the precomputed neighbor lists, optionally limited to the same shop or a price band."""
+    rows = await similar_products(session, product_id, limit, scope=scope, price_band=price_band)
+    if not rows and not (await session.exec(select(Product.id).where(Product.id == product_id))).first():
+        raise HTTPException(status_code=404, detail="Product not found")
+    return rows
+
+@router.get("/neighbors/stats")
+async def get_neighbors_stats(session: AsyncSession = Depends(get_session)):
+    return await neighbors_stats(session)
+
+@router.get("/embedding-queue")
+async def get_embedding_queue_stats(session: AsyncSession = Depends(get_session)):
+    return await queue_stats(session)
+
+@router.post("/embedding-queue/reembed")
+async def reembed_products(session: AsyncSession = Depends(get_session)):
+    """Queue every product not embedded with the current EMBEDDING_MODEL."""
+    return {"queued": await queue_reembed(session)}
+
+@router.get("/embedding-cache/stats")
+async def get_embedding_cache_stats():
+    return embedding_cache.stats()
 
-    return results
\ No newline at end of file
+@router.get("/search-cache/stats")
+async def get_search_cache_stats():
+    return search_cache.stats()
@@ -1,64 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
 
-from src.models.shop import Shop
-from src.db import get_session
-from src.schemas.shop import ShopResponse, CreateShopRequest, ShopWithProductsResponse
+from src.models.shop import Shop, ShopStats
+from src.models.product import Product
+from src.db import get_session, get_read_session
+from src.schemas.shop import ShopResponse, ShopListResponse, CreateShopRequest, ShopWithProductsResponse, ShopDeletionResponse
+from src.lib.catalog import bump_catalog_version
+from src.lib.shop_stats import get_shop_stats, stats_dict
+from src.lib.shop_deletion import schedule_shop_deletion, deletion_status
+from src.lib.pagination import keyset_paginate, next_cursor, parse_fields, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from src.constants import API_VERSION
 
 router = APIRouter(prefix=f"/api/{API_VERSION}/shops", tags=["Shops"])
 
-@router.get("/", response_model=List[ShopResponse])
-def get_shops(session: Session = Depends(get_session)):
-    return session.exec(select(Shop)).all()
+SHOP_LIST_FIELDS = ("id", "name", "description", "tags", "created_at", "updated_at")
+SHOP_LIST_OPTIONAL_FIELDS = ("stats",)
+SHOP_PRODUCT_FIELDS = ("id", "name", "description", "price", "shop_id", "embedding_status")
+
+@router.get("/", response_model=List[ShopListResponse], response_model_exclude_unset=True)
+async def get_shops(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    selected = parse_fields(fields, SHOP_LIST_FIELDS + SHOP_LIST_OPTIONAL_FIELDS, SHOP_LIST_FIELDS)
+    columns = [Shop.id, Shop.created_at]
+    columns += [getattr(Shop, field) for field in selected if field not in ("id", "created_at", "stats")]
+    if "stats" in selected:
+        columns.append(ShopStats)
+    stmt = select(*columns).where(Shop.deleted_at.is_(None))
+    if "stats" in selected:
+        stmt = stmt.outerjoin(ShopStats, ShopStats.shop_id == Shop.id)
+    stmt = keyset_paginate(stmt, Shop.created_at, Shop.id, cursor, limit)
+
+    rows, next_page = next_cursor((await session.exec(stmt)).all(), limit)
+    shops = []
+    for row in rows:
+        item = {field: row._mapping[field] for field in selected if field != "stats"}
+        if "stats" in selected:
+            item["stats"] = stats_dict(row._mapping[ShopStats])
+        shops.append(item)
+    headers = {"X-Next-Cursor": next_page} if next_page else None
+    return ORJSONResponse(shops, headers=headers)
 
 @router.post("/", response_model=ShopResponse)
-def create_shop(shop: CreateShopRequest, session: Session = Depends(get_session)):
+async def create_shop(shop: CreateShopRequest, session: AsyncSession = Depends(get_session)):
     # Check if shop with same name already exists
-    existing_shop = session.exec(select(Shop).where(Shop.name == shop.name)).first()
+    existing_shop = (await session.exec(select(Shop).where(Shop.name == shop.name, Shop.deleted_at.is_(None)))).first()
     if existing_shop:
         raise HTTPException(status_code=400, detail="Shop with this name already exists")
 
     db_shop = Shop(**shop.dict())
     session.add(db_shop)
-    session.commit()
-    session.refresh(db_shop)
-    return db_shop
+    await session.commit()
+    await session.refresh(db_shop)
+    return ShopResponse(**db_shop.model_dump(), stats=stats_dict(await get_shop_stats(session, db_shop.id)))
 
 @router.get("/{shop_id}", response_model=ShopWithProductsResponse)
-def get_shop(shop_id: str, session: Session = Depends(get_session)):
-    shop = session.exec(select(Shop).where(Shop.id == shop_id)).first()
+async def get_shop(
+    shop_id: UUID,
+    include_products: bool = False,
+    products_cursor: Optional[str] = None,
+    products_limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Shop details with catalog stats; include_products=true adds one keyset page of products.
+
+    Further pages are requested with products_cursor, taken from the X-Next-Cursor header.
+    """
+    # Build the response straight from row tuples: no ORM objects, no response model validation
+    shop = (await session.exec(
+        select(*[getattr(Shop, field) for field in SHOP_LIST_FIELDS], ShopStats)
+        .outerjoin(ShopStats, ShopStats.shop_id == Shop.id)
+        .where(Shop.id == shop_id, Shop.deleted_at.is_(None))
+    )).first()
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
-    return shop
+    response = {field: shop._mapping[field] for field in SHOP_LIST_FIELDS}
+    response["stats"] = stats_dict(shop._mapping[ShopStats])
+    headers = None
+    if include_products:
+        stmt = select(*[getattr(Product, field) for field in SHOP_PRODUCT_FIELDS], Product.created_at).where(Product.shop_id == shop_id)
+        stmt = keyset_paginate(stmt, Product.created_at, Product.id, products_cursor, products_limit)
+        products, next_page = next_cursor((await session.exec(stmt)).all(), products_limit)
+        response["products"] = [{field: row._mapping[field] for field in SHOP_PRODUCT_FIELDS} for row in products]
+        headers = {"X-Next-Cursor": next_page} if next_page else None
+    return ORJSONResponse(response, headers=headers)
 
 @router.put("/{shop_id}", response_model=ShopResponse)
-def update_shop(shop_id: str, shop_update: CreateShopRequest, session: Session = Depends(get_session)):
-    shop = session.exec(select(Shop).where(Shop.id == shop_id)).first()
+async def update_shop(shop_id: UUID, shop_update: CreateShopRequest, session: AsyncSession = Depends(get_session)):
+    shop = (await session.exec(select(Shop).where(Shop.id == shop_id, Shop.deleted_at.is_(None)))).first()
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
 
     # Check if another shop with the same name exists
-    existing_shop = session.exec(
-        select(Shop).where(Shop.name == shop_update.name, Shop.id != shop_id)
-    ).first()
+    existing_shop = (await session.exec(
+        select(Shop).where(Shop.name == shop_update.name, Shop.id != shop_id, Shop.deleted_at.is_(None))
+    )).first()
     if existing_shop:
         raise HTTPException(status_code=400, detail="Shop with this name already exists")
 
     for field, value in shop_update.dict().items():
         setattr(shop, field, value)
+    shop.updated_at = datetime.utcnow()
+    # Tags feed the search tag filter; also drops the cached chatbot prompt
+    await bump_catalog_version(session, shop.id)
 
-    session.commit()
-    session.refresh(shop)
-    return shop
+    await session.commit()
+    await session.refresh(shop)
+    return ShopResponse(**shop.model_dump(), stats=stats_dict(await get_shop_stats(session, shop.id)))
 
-@router.delete("/{shop_id}")
-def delete_shop(shop_id: str, session: Session = Depends(get_session)):
-    shop = session.exec(select(Shop).where(Shop.id == shop_id)).first()
+@router.delete("/{shop_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_shop(shop_id: UUID, session: AsyncSession = Depends(get_session)):
+    """Hide the shop immediately; its products are purged in batches by a background job."""
+    shop = (await session.exec(select(Shop).where(Shop.id == shop_id, Shop.deleted_at.is_(None)))).first()
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
 
-    session.delete(shop)
-    session.commit()
-    return {"message": "Shop deleted successfully"}
\ No newline at end of file
+    job = await schedule_shop_deletion(session, shop)
+    await session.commit()
+    return {
+        "message": "Shop deletion scheduled",
+        "products_total": job.products_total,
+        "status_url": router.url_path_for("get_shop_deletion", shop_id=str(shop_id)),
+    }
+
+@router.get("/{shop_id}/deletion", response_model=ShopDeletionResponse)
+async def get_shop_deletion(shop_id: UUID, session: AsyncSession = Depends(get_read_session)):
+    """Progress of a shop deletion; available after the shop itself is gone."""
+    job = await deletion_status(session, shop_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No deletion requested for this shop")
+    return job
\ No newline at end of file
@@ -13,6 +13,7 @@ class ChatMessageResponse(SQLModel):
 
 class CreateChatMessageRequest(SQLModel):
     message: str
+    shop_id: Optional[UUID] = None  # chat with a shop's assistant instead of the generic one
 
 class ChatMessageWithUserResponse(SQLModel):
     id: UUID
@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel
 from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
 
 class ProductResponse(SQLModel):
     id: UUID
@@ -8,6 +9,8 @@ class ProductResponse(SQLModel):
     description: str
     price: float
     shop_id: UUID
+    embedding_status: Optional[str] = None
+    duplicate_of: Optional[UUID] = None
 
 class CreateProductRequest(SQLModel):
     name: str
@@ -15,11 +18,53 @@ class CreateProductRequest(SQLModel):
     price: float
     shop_id: UUID
 
+class BulkProductRow(SQLModel):
+    name: str
+    description: str
+    price: float
+
+class BulkImportError(SQLModel):
+    row: int
+    error: str
+
+class BulkImportResponse(SQLModel):
+    shop_id: UUID
+    total: int
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+
 class ProductSearchResponse(SQLModel):
     name: str
     price: float
     description: str
 
+class SimilarProductResponse(SQLModel):
+    id: UUID
+    name: str
+    description: str
+    price: float
+    shop_id: UUID
+    distance: float
+
+class SearchFilters(SQLModel):
+    shop_id: Optional[UUID] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    tag: Optional[str] = None  # matched against the shop's tags
+    collapse_duplicates: bool = False  # only return canonical products, see src/lib/dedup.py
+
+class SearchRecallReport(SQLModel):
+    query: str
+    limit: int
+    ef_search: Optional[int]
+    probes: Optional[int]
+    recall: float
+    ann_ms: float
+    exact_ms: float
+    ann_ids: List[UUID]
+    exact_ids: List[UUID]
+
 class ProductWithShopResponse(SQLModel):
     id: UUID
     name: str
@@ -27,5 +72,16 @@ class ProductWithShopResponse(SQLModel):
     price: float
     shop: "ShopResponse"
 
+class ProductListResponse(SQLModel):
+    # Every field is optional so `fields=` projections can omit them
+    id: Optional[UUID] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    shop_id: Optional[UUID] = None
+    created_at: Optional[datetime] = None
+    shop: Optional["ShopResponse"] = None
+
 from .shop import ShopResponse
-ProductWithShopResponse.update_forward_refs()
\ No newline at end of file
+ProductWithShopResponse.model_rebuild()
+ProductListResponse.model_rebuild()
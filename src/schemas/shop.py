@@ -3,6 +3,13 @@ from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
 
+class ShopStatsResponse(SQLModel):
+    product_count: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    avg_price: Optional[float] = None
+    updated_at: datetime  # last product insert, update or delete
+
 class ShopResponse(SQLModel):
     id: UUID
     name: str
@@ -10,12 +17,32 @@ class ShopResponse(SQLModel):
     tags: Optional[str]
     created_at: datetime
     updated_at: datetime
+    stats: Optional[ShopStatsResponse] = None
+
+class ShopListResponse(SQLModel):
+    id: Optional[UUID] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    tags: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    stats: Optional[ShopStatsResponse] = None
 
 class CreateShopRequest(SQLModel):
     name: str
     description: Optional[str] = None
     tags: Optional[str] = None  # JSON string
 
+class ShopDeletionResponse(SQLModel):
+    shop_id: UUID
+    status: str  # pending | running | done | failed
+    products_total: int
+    products_deleted: int
+    requested_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
 class ShopWithProductsResponse(SQLModel):
     id: UUID
     name: str
@@ -23,7 +50,8 @@ class ShopWithProductsResponse(SQLModel):
     tags: Optional[str]
     created_at: datetime
     updated_at: datetime
-    products: List["ProductResponse"]
+    stats: Optional[ShopStatsResponse] = None
+    products: Optional[List["ProductResponse"]] = None  # omitted with include_products=false
 
 from .product import ProductResponse
-ShopWithProductsResponse.update_forward_refs()
\ No newline at end of file
+ShopWithProductsResponse.model_rebuild()
\ No newline at end of file
@@ -22,4 +22,10 @@ class UserLoginRequest(SQLModel):
 
 class TokenResponse(SQLModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+
+class TokenUser(SQLModel):
+    id: UUID
+    email: str
+    username: Optional[str] = None
+    is_active: bool